@@ -3,6 +3,8 @@
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
 let g:VM_live_editing                     = get(g:, 'VM_live_editing', 1)
+let g:VM_live_editing_viewport            = get(g:, 'VM_live_editing_viewport', 1000)
+let g:VM_live_editing_latency             = get(g:, 'VM_live_editing_latency', 0)
 
 let g:VM_custom_commands                  = get(g:, 'VM_custom_commands', {})
 let g:VM_commands_aliases                 = get(g:, 'VM_commands_aliases', {})
@@ -16,6 +18,18 @@ let g:VM_disable_syntax_in_imode          = get(g:, 'VM_disable_syntax_in_imode'
 "Reindentation after insert mode
 
 let g:VM_reindent_filetypes               = get(g:, 'VM_reindent_filetypes', [])
+let g:VM_viewport_highlight               = get(g:, 'VM_viewport_highlight', 1000)
+let g:VM_highlight_marks                  = get(g:, 'VM_highlight_marks', 0)
+                                          \ && (has('nvim-0.5') || has('textprop'))
+let g:VM_anchor_regions                   = get(g:, 'VM_anchor_regions', 0)
+                                          \ && (has('nvim-0.5') || has('textprop'))
+let g:VM_undo_snapshots                   = get(g:, 'VM_undo_snapshots', 100)
+let g:VM_text_engine                      = get(g:, 'VM_text_engine', 1)
+let g:VM_profile                          = get(g:, 'VM_profile', 0)
+let g:VM_bulk_eventignore                 = get(g:, 'VM_bulk_eventignore',
+                                          \ 'CursorMoved,CursorMovedI,TextChanged,TextChangedI,'
+                                          \ . 'TextYankPost,InsertEnter,InsertLeave,InsertCharPre,'
+                                          \ . 'ModeChanged,WinScrolled,OptionSet')
 
 call vm#themes#init()
 call vm#plugs#buffer()
@@ -39,7 +53,7 @@ fun! vm#init_buffer(cmd_type) abort
     try
         if exists('b:visual_multi') | return s:V | endif
 
-        let b:VM_Selection = {'Vars': {}, 'Regions': [], 'Bytes': {}}
+        let b:VM_Selection = {'Vars': {}, 'Regions': [], 'Bytes': [], 'Index': {}}
         let b:visual_multi = 1
 
         let b:VM_Debug  = get(b:, 'VM_Debug', {'lines': []})
@@ -80,6 +94,10 @@ fun! vm#init_buffer(cmd_type) abort
         call vm#operators#init()
         call vm#special#commands#init()
 
+        if g:VM_profile
+            call vm#profile#start()
+        endif
+
         call vm#augroup(0)
         call vm#au_cursor(0)
 
@@ -196,6 +214,9 @@ fun! vm#clearmatches() abort
             silent! call matchdelete(m.id)
         endif
     endfor
+    if g:VM_highlight_marks
+        call vm#region#clear_marks()
+    endif
 endfun
 
 
@@ -236,6 +257,10 @@ fun! vm#au_cursor(end) abort
     augroup VM_cursormoved
         au!
         au CursorMoved  <buffer> call s:cursor_moved()
+        au CursorMoved  <buffer> call s:V.Global.update_viewport()
+        if exists('##WinScrolled')
+            au WinScrolled  <buffer> call s:V.Global.update_viewport()
+        endif
         au CursorMoved  <buffer> call s:V.Funcs.set_statusline(2)
         au CursorHold   <buffer> call s:V.Funcs.set_statusline(1)
     augroup END
@@ -275,11 +300,22 @@ endfun
 
 
 
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Lua section
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+" functions are in lua/visual_multi/regions.lua, loaded by neovim from the
+" runtimepath
+
+let g:VM_use_lua = has('nvim-0.5') && get(g:, 'VM_use_lua', 1)
+
+
+
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 " Python section
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
-if !has('python3')
+if !has('python3') || g:VM_use_lua
     let g:VM_use_python = 0
     finish
 endif
@@ -0,0 +1,60 @@
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Bulk operations
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Commands that run at all regions (normal/visual/ex commands, motions, paste,
+" align) open a context with vm#bulk#begin(), and close it with vm#bulk#end().
+" While it's open:
+"
+"   - the events in g:VM_bulk_eventignore are ignored
+"   - 'lazyredraw' is set
+"   - expr and syntax folds are not updated, they're recomputed once at the end
+"
+" Contexts can be nested, only the outermost one changes and restores options.
+" When it's closed, the User autocommand visual_multi_after_bulk is run once.
+
+let s:depth = 0
+let s:saved = {}
+
+fun! vm#bulk#begin() abort
+    " Open a bulk context.
+    let s:depth += 1
+    if s:depth > 1 | return | endif
+
+    let s:saved = {'ei': &eventignore, 'lz': &lazyredraw, 'fdm': &l:foldmethod}
+    let &eventignore = join(filter([&eventignore] + s:events(), '!empty(v:val)'), ',')
+    set lazyredraw
+    if &l:foldmethod =~ '^\%(expr\|syntax\)$'
+        setlocal foldmethod=manual
+    endif
+endfun
+
+
+fun! vm#bulk#end() abort
+    " Close a bulk context, restore options and run the autocommand.
+    if s:depth == 0 | return | endif
+    let s:depth -= 1
+    if s:depth | return | endif
+
+    if &l:foldmethod !=# s:saved.fdm
+        let &l:foldmethod = s:saved.fdm
+    endif
+    let &lazyredraw = s:saved.lz
+    let &eventignore = s:saved.ei
+    let s:saved = {}
+    silent doautocmd <nomodeline> User visual_multi_after_bulk
+endfun
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! s:events() abort
+    " Events to ignore, that exist in this vim version.
+    let events = filter(split(g:VM_bulk_eventignore, ','), 'exists("##" . v:val)')
+    " without TextYankPost, yank plugins need CursorMoved
+    if !exists('##TextYankPost')
+        call filter(events, 'v:val !=# "CursorMoved"')
+    endif
+    return events
+endfun
+
+" vim: et ts=4 sw=4 sts=4 :
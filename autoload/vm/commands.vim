@@ -39,6 +39,7 @@ fun! vm#commands#init() abort
     let s:F        = s:V.Funcs
     let s:Search   = s:V.Search
     let s:v.motion = ''
+    call vm#motions#init()
 endfun
 
 
@@ -52,34 +53,58 @@ endfun
 " Add cursor
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
-fun! s:skip_shorter_lines() abort
-    " When adding cursors below or above, don't add on shorter lines.
-    " we don't want cursors on final column('$'), except when adding at column 1
-    " in this case, moving to an empty line would give:
-    "   vcol     = 1
-    "   col      = 1
-    "   endline  = 1
-    " and the line would be skipped: check endline as 2, so that the cursor is added
-
-    if get(g:, 'VM_skip_shorter_lines', 1)
-        let vcol    = s:v.vertical_col
-        let col     = virtcol('.')
-        let endline = get(g:, 'VM_skip_empty_lines', 0) ? virtcol('$') :
-                    \                                     virtcol('$') > 1 ?
-                    \                                     virtcol('$') : 2
-
-        "skip line
-        if ( col < vcol || col == endline ) | return 1 | endif
+fun! s:vertical_col(ln, vcol) abort
+    " When adding cursors below or above, the column of the character at
+    " virtual column vcol, or 0 if the line must be skipped.
+    " With g:VM_skip_shorter_lines, don't add cursors on shorter lines, but
+    " empty lines get a cursor when adding at column 1, unless
+    " g:VM_skip_empty_lines is set.
+    let skip = get(g:, 'VM_skip_shorter_lines', 1)
+    let line = getline(a:ln)
+    if line == ''
+        return !skip || a:vcol == 1 && !get(g:, 'VM_skip_empty_lines', 0)
     endif
-
-    call s:G.new_cursor()
+    let col = match(line, '\%<' . (a:vcol + 1) . 'v.\%>' . a:vcol . 'v') + 1
+    return col || skip ? col : match(line, '.$') + 1
 endfun
 
 
-fun! s:went_too_far() abort
-    " If gone too far, because it skipped all lines, reselect region.
-    if empty(s:G.region_at_pos())
-        call s:G.select_region(s:v.index)
+fun! s:add_cursors_vertically(down, count, ...) abort
+    " Add a cursor at the current position, and count cursors below or above
+    " it, not further than line a:1. Lines in closed folds are passed over as
+    " a single line, as with j and k. Cursors are created in a single batch.
+    let s:v.vertical_col = s:F.get_vertcol()
+    let vcol = s:v.vertical_col
+    let R = s:G.new_cursor()
+
+    let ln = line('.')
+    let last = a:0 ? a:1 : a:down ? line('$') : 1
+    let [pos, N] = [[], a:count]
+
+    while N && (a:down ? ln < last : ln > last)
+        if a:down
+            let ln = foldclosedend(ln) > 0 ? foldclosedend(ln) + 1 : ln + 1
+            if ln > line('$') | break | endif
+        else
+            let ln -= 1
+        endif
+        let ln = foldclosed(ln) > 0 ? foldclosed(ln) : ln
+        let col = s:vertical_col(ln, vcol)
+        if col
+            call add(pos, [ln, col])
+            let N -= 1
+        endif
+    endwhile
+
+    if empty(pos) | return s:G.select_region(R.index) | endif
+
+    call s:G.new_cursors(a:down ? pos : reverse(copy(pos)))
+    let R = s:G.region_at_pos(pos[-1])
+    call s:G.select_region(empty(R) ? s:v.index : R.index)
+
+    " if the last line wasn't skipped, keep the column for vertical movements
+    if pos[-1][0] == ln
+        call cursor([line('.'), col('.'), 0, vcol])
     endif
 endfun
 
@@ -95,39 +120,19 @@ fun! vm#commands#add_cursor_at_pos(extend) abort
 endfun
 
 
-fun! vm#commands#add_cursor_down(extend, count) abort
-    " Add cursors vertically, downwards.
+fun! vm#commands#add_cursor_down(extend, count, ...) abort
+    " Add cursors vertically, downwards, optionally not beyond line a:1.
     if s:last_line() | return | endif
     call s:set_extend_mode(a:extend)
-    let s:v.vertical_col = s:F.get_vertcol()
-    call s:G.new_cursor()
-    let N = a:count
-
-    while N
-        normal! j
-        if !s:skip_shorter_lines() | let N -= 1 | endif
-        if s:last_line()           | break      | endif
-    endwhile
-
-    call s:went_too_far()
+    call call('s:add_cursors_vertically', [1, a:count] + a:000)
 endfun
 
 
-fun! vm#commands#add_cursor_up(extend, count) abort
-    " Add cursors vertically, upwards.
+fun! vm#commands#add_cursor_up(extend, count, ...) abort
+    " Add cursors vertically, upwards, optionally not beyond line a:1.
     if s:first_line() | return | endif
     call s:set_extend_mode(a:extend)
-    let s:v.vertical_col = s:F.get_vertcol()
-    call s:G.new_cursor()
-    let N = a:count
-
-    while N
-        normal! k
-        if !s:skip_shorter_lines() | let N -= 1 | endif
-        if s:first_line()          | break      | endif
-    endwhile
-
-    call s:went_too_far()
+    call call('s:add_cursors_vertically', [0, a:count] + a:000)
 endfun
 
 
@@ -650,59 +655,65 @@ fun! vm#commands#regex_motion(regex, count, remove) abort
     let [ R, X ] = [ s:R()[ s:v.index ], s:X() ]
     call s:before_move()
 
-    if s:v.direction
-        for r in ( s:v.single_region ? [R] : s:R() )
-            call cursor(r.L, r.b)
-            " When using slash search, always search multiline
-            let is_slash = get(s:v, 'slash_search', 0)
-            let endl = is_slash ? line('$') : (s:v.multiline && !empty(a:regex) ? line('$') : r.L)
-            if !search(regex . case, 'z', endl)
-                if a:remove | call r.remove() | endif
-                continue
-            endif
-            if X
-                " In extend mode, update both start (l,a) and end (L,b) positions
-                let [r.l, r.a] = getpos('.')[1:2]
-                let [r.L, r.b] = getpos('.')[1:2]
-                call r.update_region()
-            else
-                call r.update_cursor_pos()
-            endif
-        endfor
-    else
-        for r in ( s:v.single_region ? [R] : s:R() )
-            call cursor(r.L, r.b)
-            " When using slash search, always search multiline
-            let is_slash = get(s:v, 'slash_search', 0)
-            let startl = is_slash ? 1 : (s:v.multiline && !empty(a:regex) ? 1 : r.l)
-            if !search(regex . case, 'b', startl)
-                if a:remove | call r.remove() | endif
-                continue
-            endif
-            if X
-                " In extend mode, update both start (l,a) and end (L,b) positions
-                let [r.l, r.a] = getpos('.')[1:2]
-                let [r.L, r.b] = getpos('.')[1:2]
-                call r.update_region()
-            else
-                call r.update_cursor_pos()
-            endif
-        endfor
-    endif
+    call vm#bulk#begin()
 
-    " if using slash-search, it's safer to merge regions
-    " a region update is also needed for some reason (some bytes map issue)
-    if !empty(a:regex)
-        let s:v.merge = 1
-        if !a:remove
-            call s:G.update_regions()
+    try
+        if s:v.direction
+            for r in ( s:v.single_region ? [R] : s:R() )
+                call cursor(r.L, r.b)
+                " When using slash search, always search multiline
+                let is_slash = get(s:v, 'slash_search', 0)
+                let endl = is_slash ? line('$') : (s:v.multiline && !empty(a:regex) ? line('$') : r.L)
+                if !search(regex . case, 'z', endl)
+                    if a:remove | call r.remove() | endif
+                    continue
+                endif
+                if X
+                    " In extend mode, update both start (l,a) and end (L,b) positions
+                    let [r.l, r.a] = getpos('.')[1:2]
+                    let [r.L, r.b] = getpos('.')[1:2]
+                    call r.update_region()
+                else
+                    call r.update_cursor_pos()
+                endif
+            endfor
+        else
+            for r in ( s:v.single_region ? [R] : s:R() )
+                call cursor(r.L, r.b)
+                " When using slash search, always search multiline
+                let is_slash = get(s:v, 'slash_search', 0)
+                let startl = is_slash ? 1 : (s:v.multiline && !empty(a:regex) ? 1 : r.l)
+                if !search(regex . case, 'b', startl)
+                    if a:remove | call r.remove() | endif
+                    continue
+                endif
+                if X
+                    " In extend mode, update both start (l,a) and end (L,b) positions
+                    let [r.l, r.a] = getpos('.')[1:2]
+                    let [r.L, r.b] = getpos('.')[1:2]
+                    call r.update_region()
+                else
+                    call r.update_cursor_pos()
+                endif
+            endfor
+        endif
+
+        " if using slash-search, it's safer to merge regions
+        " a region update is also needed for some reason (some bytes map issue)
+        if !empty(a:regex)
+            let s:v.merge = 1
+            if !a:remove
+                call s:G.update_regions()
+            endif
         endif
-    endif
 
-    " update variables, facing direction, highlighting
-    " Pass the current region after the move, not the old one
-    let R_current = s:R()[ s:v.index ]
-    call s:after_move(R_current)
+        " update variables, facing direction, highlighting
+        " Pass the current region after the move, not the old one
+        let R_current = s:R()[ s:v.index ]
+        call s:after_move(R_current)
+    finally
+        call vm#bulk#end()
+    endtry
 endfun
 
 
@@ -718,11 +729,24 @@ fun! s:call_motion(...) abort
     let regions = (a:0 && a:1) || s:v.single_region ? [R] : s:R()
 
     call s:before_move()
+    call vm#bulk#begin()
 
-    for r in regions | call r.move() | endfor
+    try
+        if !vm#motions#move(regions)
+            for r in regions | call r.move() | endfor
+        endif
 
-    "update variables, facing direction, highlighting
-    call s:after_move(R)
+        "cursors stopped at the first or last line by j/k can be out of order
+        if !s:X() && s:v.motion =~# '^\d*[jk]$' &&
+                    \ (s:R()[0].l == 1 || s:R()[-1].l == line('$'))
+            call s:G.reorder_regions()
+        endif
+
+        "update variables, facing direction, highlighting
+        call s:after_move(R)
+    finally
+        call vm#bulk#end()
+    endtry
 endfun
 
 
@@ -1018,22 +1042,11 @@ fun! vm#commands#mouse_column() abort
     exe "normal! \<LeftMouse>"
     let end = getpos('.')[1:2]
 
+    call cursor(start[0], start[1])
     if start[0] < end[0]
-        call cursor(start[0], start[1])
-        while getpos('.')[1] < end[0]
-            call vm#commands#add_cursor_down(0, 1)
-        endwhile
-        if getpos('.')[1] > end[0]
-            call vm#commands#skip(1)
-        endif
-    else
-        call cursor(start[0], start[1])
-        while getpos('.')[1] > end[0]
-            call vm#commands#add_cursor_up(0, 1)
-        endwhile
-        if getpos('.')[1] < end[0]
-            call vm#commands#skip(1)
-        endif
+        call vm#commands#add_cursor_down(0, end[0] - start[0], end[0])
+    elseif start[0] > end[0]
+        call vm#commands#add_cursor_up(0, start[0] - end[0], end[0])
     endif
 endfun
 
@@ -70,8 +70,6 @@ fun! s:Edit.delete(X, register, count, manual) abort
     endif
 
     let winline      = winline()
-    let size         = s:F.size()
-    let change       = 0
     let ix           = s:G.select_region_at_pos('.').index
     let s:old_text   = s:G.regions_text()
     let retVal       = copy(s:old_text)
@@ -80,8 +78,16 @@ fun! s:Edit.delete(X, register, count, manual) abort
     " manual deletion: backup current regions
     if a:manual | call s:G.backup_regions() | endif
 
-    for r in s:R()
-        call r.shift(change, change)
+    " single-line regions can be deleted directly from the text of the lines
+    if vm#textops#delete()
+        let regions = []
+    else
+        let regions = s:R()
+        call s:G.track_regions()
+    endif
+
+    for r in regions
+        call s:G.track_region(r)
         call self.extra_spaces.add(r)
         call cursor(r.l, r.a)
         if r.w == 1
@@ -91,10 +97,8 @@ fun! s:Edit.delete(X, register, count, manual) abort
           call cursor(r.L, r.b>1? r.b+1 : 1)
           normal! m]`["_d`]
         endif
-
-        "update changed size
-        let change = s:F.size() - size
     endfor
+    call s:G.untrack_regions()
 
     "write custom and possibly vim registers.
     call self.fill_register(a:register, s:old_text, a:manual)
@@ -152,27 +156,45 @@ fun! s:Edit.paste(before, vim_reg, reselect, register, ...) abort
     endif
 
     call s:G.backup_regions()
-
-    if X | call self.delete(1, "_", 1, 0) | endif
-
-    call self.block_paste(a:before)
-
-    let s:v.W = self.store_widths(s:v.new_text)
-    call self.post_process((X? 1 : a:reselect), !a:before)
+    call vm#bulk#begin()
+
+    try
+        " selections are deleted and replaced in a single write, if possible
+        call vm#textops#begin()
+        try
+            if X | call self.delete(1, "_", 1, 0) | endif
+            call self.block_paste(a:before)
+        finally
+            call vm#textops#commit()
+        endtry
+
+        let s:v.W = self.store_widths(s:v.new_text)
+        call self.post_process((X? 1 : a:reselect), !a:before)
+    finally
+        call vm#bulk#end()
+    endtry
     let s:old_text = []
 endfun " }}}
 
 
 fun! s:Edit.block_paste(before) abort
     " Paste the new text (list-type) at cursors. {{{1
-    let size = s:F.size()
     let text = copy(s:v.new_text)
-    let change = 0
     let s:v.eco = 1
 
-    for r in s:R()
+    " text without line breaks can be inserted directly in the lines
+    if vm#textops#paste(text, a:before)
+        let regions = []
+    else
+        " pending changes must be written before running normal commands
+        call vm#textops#commit()
+        let regions = s:R()
+        call s:G.track_regions()
+    endif
+
+    for r in regions
         if !empty(text)
-            call r.shift(change, change)
+            call s:G.track_region(r)
             call cursor(r.l, r.a)
             let s = remove(text, 0)
             call s:F.set_reg(s)
@@ -185,13 +207,11 @@ fun! s:Edit.block_paste(before) abort
                     call r.update_cursor_pos()
                 endif
             endif
-
-            "update changed size
-            let change = s:F.size() - size
         else
             break
         endif
     endfor
+    call s:G.untrack_regions()
     silent! unlet s:v.dont_move_cursors
     call s:F.restore_reg()
 endfun " }}}
@@ -400,8 +420,19 @@ endfun " }}}
 
 fun! s:Edit.replace_regions_with_text(text, ...) abort
     " Paste a custom list of strings into current regions. {{{1
-    call self.fill_register('"', a:text, 0)
     let before = !a:0 || !a:1
+
+    " the text can often be replaced in a single pass, without registers
+    if s:X() | call s:G.backup_last_regions() | endif
+    let s:v.eco = 1
+
+    if vm#textops#replace(a:text, before)
+        let s:v.W = self.store_widths(a:text)
+        call self.post_process(s:X(), !before)
+        return
+    endif
+
+    call self.fill_register('"', a:text, 0)
     call self.paste(before, 0, s:X(), '"')
 endfun " }}}
 
@@ -198,26 +198,32 @@ fun! s:Edit.align() abort
     if s:v.multiline
         return s:F.msg('Not possible, multiline is enabled.')
     endif
-    call s:G.cursor_mode()
-
-    call self.run_normal('D', {'store': '§'})
-    let max = max(map(copy(s:R()), 'virtcol([v:val.l, v:val.a])'))
-    let reg = g:Vm.registers['§']
-    for r in s:R()
-        let spaces = ''
-        let L = getline(r.l)
-        if empty(L)
-            while len(spaces) < max | let spaces .= ' ' | endwhile
-            call setline(r.l, L[:r.a-1] . spaces . L[r.a:] . reg[r.index])
-            call r.update_cursor([r.l, r.a + len(spaces) - 1])
-        else
-            while len(spaces) < (max - virtcol([r.l, r.a])) | let spaces .= ' ' | endwhile
-            call setline(r.l, L[:r.a-1] . spaces . L[r.a:] . reg[r.index])
-            call r.update_cursor([r.l, r.a + len(spaces)])
-        endif
-    endfor
-    call s:G.update_and_select_region()
-    call vm#commands#motion('l', 1, 0, 0)
+    call vm#bulk#begin()
+
+    try
+        call s:G.cursor_mode()
+
+        call self.run_normal('D', {'store': '§'})
+        let max = max(map(copy(s:R()), 'virtcol([v:val.l, v:val.a])'))
+        let reg = g:Vm.registers['§']
+        for r in s:R()
+            let spaces = ''
+            let L = getline(r.l)
+            if empty(L)
+                while len(spaces) < max | let spaces .= ' ' | endwhile
+                call setline(r.l, L[:r.a-1] . spaces . L[r.a:] . reg[r.index])
+                call r.update_cursor([r.l, r.a + len(spaces) - 1])
+            else
+                while len(spaces) < (max - virtcol([r.l, r.a])) | let spaces .= ' ' | endwhile
+                call setline(r.l, L[:r.a-1] . spaces . L[r.a:] . reg[r.index])
+                call r.update_cursor([r.l, r.a + len(spaces)])
+            endif
+        endfor
+        call s:G.update_and_select_region()
+        call vm#commands#motion('l', 1, 0, 0)
+    finally
+        call vm#bulk#end()
+    endtry
 endfun
 
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
@@ -18,6 +18,7 @@ fun! vm#edit#init() abort
     let s:can_multiline  = 0
 
     call vm#icmds#init()
+    call vm#textops#init()
     return extend(s:Edit, vm#ecmds1#init())
 endfun
 
@@ -222,11 +223,21 @@ fun! s:Edit.run_macro() abort
     endif
 
     call self.before_commands()
-    call s:G.cursor_mode()
+    let errors = ''
+
+    try
+        call s:G.cursor_mode()
+        call self.process('normal! @'.reg)
+    catch
+        let errors = v:errmsg
+    endtry
 
-    call self.process('normal! @'.reg)
     let s:v.merge = 1
     call self.after_commands(0)
+
+    if !empty(errors)
+        call s:F.msg('[visual-multi] errors while executing macro @'.reg)
+    endif
 endfun
 
 
@@ -260,9 +271,8 @@ endfun
 fun! s:Edit.process(cmd, ...) abort
     " Execute command at cursors.
     let s:v.eco = 1             " turn on eco mode
-    let change  = 0             " each cursor will update this value
     let txt     = []            " if text is deleted, it will be stored here
-    let size    = s:F.size()    " initial buffer size
+    call vm#region#set_dirty(s:R())
 
     if empty(s:v.storepos) | let s:v.storepos = getpos('.')[1:2] | endif
 
@@ -302,61 +312,65 @@ fun! s:Edit.process(cmd, ...) abort
 
     call s:G.backup_regions()
 
-    for r in s:R()
-        " used in non-live edit, currently disabled
-        if !s:v.auto && r.index == self.skip_index | continue | endif
+    " simple commands can be applied directly to the text of the lines
+    if !gcount && s:v.auto && vm#textops#normal(a:cmd, stay_put, txt)
+        let regions = []
+    else
+        let regions = s:R()
+        call s:G.track_regions()
+    endif
 
-        " update cursor position on the base of previous text changes
-        call r.shift(change, change)
+    " if the command yanks, plugins that react to yanks are kept quiet
+    let yank = a:cmd =~ '\v^.*y[^a-zA-Z]|^y$'
+    if yank | call vm#highlightedyank#begin() | endif
 
-        " execute command at cursor
-        call cursor(r.l, r.a)
+    try
+        for r in regions
+            " used in non-live edit, currently disabled
+            if !s:v.auto && r.index == self.skip_index | continue | endif
 
-        if gcount
-            let tick = b:changedtick
-            " Check if command contains yank operation - if so, suppress highlightedyank
-            if a:cmd =~ '\v^.*y[^a-zA-Z]|^y$'
-                call vm#highlightedyank#execute_silent('normal! ' . gcount . a:cmd)
-            else
+            " update cursor position on the base of previous text changes
+            call s:G.track_region(r)
+
+            " execute command at cursor
+            call cursor(r.l, r.a)
+
+            if gcount
+                let tick = b:changedtick
                 exe 'normal! ' . gcount . a:cmd
-            endif
-            if b:changedtick > tick
-                let gcount += a:1.count
-            endif
-        else
-            " Check if command contains yank operation - if so, suppress highlightedyank
-            if a:cmd =~ '\v^.*y[^a-zA-Z]|^y$'
-                call vm#highlightedyank#execute_silent(a:cmd)
+                if b:changedtick > tick
+                    let gcount += a:1.count
+                endif
             else
                 exe a:cmd
             endif
-        endif
 
-        " store deleted text during deletions/changes at cursors
-        if backup_txt
-            if @" == ''
-                let backup_txt = v:false
-                let write_reg = v:false
-                let must_restore_register = v:true
-            else
-                call add(txt, getreg(s:v.def_reg))
+            " store deleted text during deletions/changes at cursors
+            if backup_txt
+                if @" == ''
+                    let backup_txt = v:false
+                    let write_reg = v:false
+                    let must_restore_register = v:true
+                else
+                    call add(txt, getreg(s:v.def_reg))
+                endif
             endif
-        endif
-
-        " update new cursor position after the command, unless specified
-        let diff = s:F.curs2byte() - r.A
-        if !stay_put
-            call r.shift(diff, diff)
-        endif
 
-        " update changed size
-        let change = s:F.size() - size
+            " update new cursor position after the command, unless specified
+            let diff = s:F.curs2byte() - r.A
+            if !stay_put
+                call r.shift(diff, diff)
+            endif
 
-        " let's force CursorMoved in case some yank command needs it
-        if !diff && do_cursor_moved
-            silent! doautocmd <nomodeline> CursorMoved
-        endif
-    endfor
+            " let's force CursorMoved in case some yank command needs it
+            if !diff && do_cursor_moved
+                silent! doautocmd <nomodeline> CursorMoved
+            endif
+        endfor
+    finally
+        if yank | call vm#highlightedyank#end() | endif
+    endtry
+    call s:G.untrack_regions()
 
     if must_restore_register
         call setreg('"', oldreg[0], oldreg[1])
@@ -377,23 +391,21 @@ endfun
 fun! s:Edit.process_visual(cmd, recursive) abort
     " Process a 'visual' command over selections.
     let s:v.eco = 1             " turn on eco mode
-    let change  = 0             " each cursor will update this value
-    let size    = s:F.size()    " initial buffer size
     let s:v.storepos = getpos('.')[1:2]
 
     let cmd = a:recursive ? 'normal '.a:cmd : 'normal! '.a:cmd
+    call vm#region#set_dirty(s:R())
 
     call s:G.backup_regions()
+    call s:G.track_regions()
 
     for r in s:R()
-        call r.shift(change, change)
+        call s:G.track_region(r)
         call cursor(r.L, r.b) | normal! m`
         call cursor(r.l, r.a) | normal! v``
         exe cmd
-
-        "update changed size
-        let change = s:F.size() - size
     endfor
+    call s:G.untrack_regions()
 endfun
 
 
@@ -428,10 +440,12 @@ fun! s:Edit.extra_spaces.remove(...) abort
         "some region has been removed for some reason(merge, ...)
         if i >= len(s:R()) | break | endif
 
-        let l = s:R()[i].L + (a:0? a:1 : 0)
+        let r = s:R()[i]
+        let l = r.L + (a:0? a:1 : 0)
         let Line = getline(l)
         if Line[-1:-1] ==# ' '
             call setline(l, Line[:-2])
+            let r.dirty = 1
         endif
     endfor
     let s:v.extra_spaces = []
@@ -460,6 +474,7 @@ endfun
 fun! s:Edit.before_commands() abort
     " Disable mappings and run user autocommand before running commands.
     let s:v.auto = 1 | let s:v.eco = 1
+    call vm#bulk#begin()
 
     let s:old_multiline = s:v.multiline
     let s:v.multiline = s:can_multiline
@@ -474,14 +489,17 @@ endfun
 fun! s:Edit.after_commands(reselect, ...) abort
     " Trigger post processing and reenable mappings.
     let s:v.multiline = s:old_multiline
-    if a:reselect
-        call s:V.Edit.post_process(1, a:1)
-    else
-        call s:V.Edit.post_process(0)
-    endif
-
-    call s:V.Maps.enable()
-    call s:V.Maps.map_esc_and_toggle()
+    try
+        if a:reselect
+            call s:V.Edit.post_process(1, a:1)
+        else
+            call s:V.Edit.post_process(0)
+        endif
+    finally
+        call vm#bulk#end()
+        call s:V.Maps.enable()
+        call s:V.Maps.map_esc_and_toggle()
+    endtry
     silent doautocmd <nomodeline> User visual_multi_after_cmd
 endfun
 
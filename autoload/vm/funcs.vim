@@ -163,10 +163,7 @@ endfun
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
 fun! s:Funcs.region_with_id(id) abort
-    for r in s:R()
-        if r.id == a:id | return r | endif
-    endfor
-    return {}
+    return get(s:V.Global.regions_index().ids, a:id, {})
 endfun
 
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
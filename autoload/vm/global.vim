@@ -68,28 +68,152 @@ endfun
 fun! s:Global.get_all_regions(...) abort
     " Get all regions, optionally between two byte offsets.
 
+    call vm#highlightedyank#begin()
     let [ows, ei] = [&wrapscan, &eventignore]
     set nowrapscan eventignore=all
-    let [l:start, l:end] = a:0 ? [a:1, a:2] : [1, 0]
-    call s:F.Cursor(l:start)
+    try
+        let [l:start, l:end] = a:0 ? [a:1, a:2] : [1, 0]
+        let matches = s:find_matches(l:start, l:end)
+        if type(matches) == v:t_list
+            " the search stops on the first match past the end, if any
+            let pos = getpos('.')
+            let R = self.new_regions(matches)
+            if a:0 && s:F.pos2byte(pos[1:2]) > l:end
+                call setpos('.', pos)
+            endif
+        else
+            let R = s:yank_all_regions(l:start, l:end, a:0)
+        endif
+    finally
+        let &wrapscan = ows
+        let &eventignore = ei
+        call vm#highlightedyank#end()
+    endtry
+    return R
+endfun
+
+
+fun! s:Global.new_regions(matches) abort
+    " Create regions from a list of [l, L, a, b, txt] matches, sorted by
+    " offset. Matches that start inside another region are skipped.
+    " Return the region at the last match, new or not.
+
+    let [list, maxB, check, last] = [[], 0, !empty(s:R()), {}]
+    for m in a:matches
+        let A = line2byte(m[0]) + m[2] - 1
+        if A <= maxB
+            let last = {}
+            continue
+        elseif check
+            let last = self.region_at_pos(A)
+            if !empty(last) | continue | endif
+        endif
+        call add(list, m)
+        let maxB = line2byte(m[1]) + m[3] + strlen(m[4][-1:]) - 2
+    endfor
+    if empty(list) && empty(last) | return {} | endif
+
+    if !empty(list)
+        let new = vm#region#new_list(list)
+        if !s:v.find_all_overlap && check
+            for r in new
+                if self.overlapping_regions(r)
+                    let s:v.find_all_overlap = 1
+                    break
+                endif
+            endfor
+        endif
+    endif
+
+    let R = empty(last) ? new[-1] : last
+    let s:v.was_region_at_pos = !empty(last)
+    if !s:v.eco
+        call self.select_region(R.index)
+        call s:V.Search.update_patterns()
+        call s:F.restore_reg()
+    endif
+    return R
+endfun
+
+
+fun! s:Global.new_cursors(positions) abort
+    " Create cursors at a list of [line, col] positions, sorted by offset.
+    " Positions where there is already a region are skipped.
+    " Return the list of the new regions.
+
+    let [list, check] = [[], !empty(s:R())]
+    for [l, a] in a:positions
+        if check && !empty(self.region_at_pos([l, a]))
+            continue
+        endif
+        call add(list, [l, l, a, a, s:X() ? s:F.char_at_pos(l, a) : ''])
+    endfor
+    return vm#region#new_list(list)
+endfun
+
+
+fun! s:find_matches(start, end) abort
+    " Find the matches of the search pattern with searchpos(), starting from
+    " offset start and, if not 0, up to offset end. The match end and text are
+    " taken from the line itself, so that registers aren't touched.
+    " Return a list of [l, L, a, b, txt], or an empty string if the pattern
+    " can't be matched this way (multiline, zero-width, context dependent).
+
+    let pat = @/
+    if pat =~ '\\n\|\\_\|\\%[V#]' | return '' | endif
+
+    " match() doesn't use 'smartcase'
+    if pat !~# '\\[cC]'
+        let upper = substitute(pat, '\\.', '', 'g') =~# '\u'
+        let pat = (&ignorecase && !(&smartcase && upper) ? '\c' : '\C') . pat
+    endif
+
+    let [matches, flags, last] = [[], 'cW', []]
+    call s:F.Cursor(a:start)
+    while 1
+        let [l, a] = searchpos(@/, flags)
+        if !l | break | endif
+        let line = getline(l)
+        let e = matchend(line, pat, a - 1)
+        if e < a || match(line, pat, a - 1) != a - 1 | return '' | endif
+        let last = [l, a, e]
+        if a:end && !empty(matches) && line2byte(l) + a - 1 > a:end
+            break
+        endif
+        " like the '] mark after a yank, end column is the last byte
+        call add(matches, [l, l, a, e, strpart(line, a - 1, e - a + 1)])
+        let flags = 'W'
+    endwhile
+
+    " marks are left as if the last match had been yanked
+    if !empty(last)
+        call setpos("'[", [0, last[0], last[1], 0])
+        call setpos("']", [0, last[0], last[2], 0])
+    endif
+    return matches
+endfun
+
+
+fun! s:yank_all_regions(start, end, range) abort
+    " Get all regions by yanking each match with 'gn'.
+    let G = s:V.Global
+    call s:F.Cursor(a:start)
     call vm#highlightedyank#execute_silent('silent keepjumps normal! ygn')
-    let R = self.new_region()
+    let R = G.new_region()
     while 1
         try
             call vm#highlightedyank#execute_silent('silent keepjumps normal! nygn')
-            if a:0 && s:F.pos2byte("'[") > l:end
+            if a:range && s:F.pos2byte("'[") > a:end
                 break
             endif
-            let R = self.new_region()
-            if !s:v.find_all_overlap && self.overlapping_regions(R)
+            let R = G.new_region()
+            if !s:v.find_all_overlap && G.overlapping_regions(R)
                 let s:v.find_all_overlap = 1
             endif
         catch
             break
         endtry
     endwhile
-    let &wrapscan = ows
-    let &eventignore = ei
     return R
 endfun
 
@@ -150,7 +274,9 @@ fun! s:Global.update_highlight(...) abort
     if s:v.eco | return | endif
 
     call self.remove_highlight()
-    for r in s:R()
+    call self.set_viewport()
+
+    for r in self.viewport_regions()
         call r.highlight()
     endfor
 
@@ -158,6 +284,50 @@ fun! s:Global.update_highlight(...) abort
 endfun
 
 
+fun! s:Global.set_viewport(...) abort
+    " With many regions, only highlight regions in the lines around the window.
+    " The highlighted lines are stored in s:v.hl_lines, empty if all regions
+    " are highlighted. The optional argument is the number of regions.
+
+    let n = a:0 ? a:1 : len(s:R())
+    if !g:VM_viewport_highlight || n <= g:VM_viewport_highlight
+        let s:v.hl_lines = []
+    else
+        let margin = winheight(0)
+        let s:v.hl_lines = [max([1, line('w0') - margin]), line('w$') + margin]
+    endif
+endfun
+
+
+fun! s:Global.update_viewport() abort
+    " Update highlight if the window has been scrolled out of the highlighted
+    " lines.
+    if empty(s:v.hl_lines) || s:v.eco || s:v.insert | return | endif
+
+    if line('w0') < s:v.hl_lines[0] || line('w$') > s:v.hl_lines[1]
+        call self.update_highlight()
+    endif
+endfun
+
+
+fun! s:Global.viewport_regions() abort
+    " Return the regions in the highlighted lines, or all regions.
+    if empty(s:v.hl_lines) | return s:R() | endif
+
+    let [top, bot] = [s:v.hl_lines[0], min([s:v.hl_lines[1], line('$')])]
+    let i = self.bisect('B', line2byte(top) - 1)
+    let j = self.bisect('A', line2byte(bot + 1) - 1)
+    return j > i ? s:R()[i : j - 1] : []
+endfun
+
+
+fun! s:Global.in_viewport(r) abort
+    " Check if a region is in the highlighted lines.
+    return empty(s:v.hl_lines) ||
+                \ a:r.L >= s:v.hl_lines[0] && a:r.l <= s:v.hl_lines[1]
+endfun
+
+
 fun! s:Global.update_cursor_highlight(...) abort
     " Set cursor highlight, depending on extending mode.
     if s:v.eco | return | endif
@@ -178,7 +348,11 @@ endfun
 
 fun! s:Global.remove_highlight() abort
     " Remove all regions' highlight.
-    for r in s:R()
+    for r in self.viewport_regions()
+        if g:VM_highlight_marks
+            "marks are removed all at once by vm#clearmatches()
+            let r.matches.marks = []
+        endif
         call r.remove_highlight()
     endfor
     call vm#clearmatches()
@@ -209,7 +383,7 @@ fun! s:Global.update_regions() abort
     if s:X()
         for r in s:R() | call r.update_region() | endfor
     else
-        for r in s:R() | call r.update_cursor() | endfor
+        call vm#region#update_cursors(s:R())
     endif
     call self.update_highlight()
     call s:F.restore_reg()
@@ -285,11 +459,46 @@ fun! s:Global.update_map_and_select_region(...) abort
 endfun
 
 
+fun! s:Global.regions_from_list(list) abort
+    " Replace regions with a list of items, already sorted by offset.
+    " An item is either the index of an existing region to keep, or the
+    " arguments for vm#region#new(): [A, B] offsets or [l, L, a, b] positions.
+
+    let [old, keep, removed] = [s:R(), {}, {}]
+    for item in a:list
+        if type(item) == v:t_number | let keep[item] = 1 | endif
+    endfor
+    for r in old
+        if !has_key(keep, r.index)
+            call r.remove_highlight()
+            let removed[r.id] = 1
+        endif
+    endfor
+    if !empty(removed)
+        call filter(s:v.IDs_list, '!has_key(removed, v:val)')
+    endif
+
+    let s:V.Regions = []
+    let s:V.Index = {}
+    for item in a:list
+        if type(item) == v:t_number
+            let r = old[item]
+            let r.index = len(s:R())
+            call add(s:R(), r)
+        else
+            call call('vm#region#new', [0] + item)
+        endif
+    endfor
+    let s:v.index = min([s:v.index, len(s:R()) - 1])
+endfun
+
+
 fun! s:Global.erase_regions() abort
     " Erase all regions.
     call self.remove_highlight()
     let s:V.Regions = []
-    let s:V.Bytes = {}
+    let s:V.Bytes = []
+    let s:V.Index = {}
     let s:v.index = -1
 endfun
 
@@ -299,26 +508,58 @@ fun! s:Global.restore_regions(index) abort
     let backup = b:VM_Backup | call self.erase_regions()
 
     let tick = backup.ticks[a:index]
-    let s:V.Regions = deepcopy(backup[tick].regions)
     let g:Vm.extend_mode = backup[tick].X
+    let s:v.IDs_list = []
+
+    "recreate regions from their positions, without highlight and contents:
+    "they are updated right after
+    let [eco, s:v.eco] = [s:v.eco, 1]
+    let saved = backup[tick].regions
+    let new = vm#region#new_list(map(copy(saved), 'v:val[:3] + [""]'))
+    let s:v.eco = eco
+
+    for i in range(len(new))
+        let new[i].dir = saved[i][4]
+    endfor
     return self.update_and_select_region()
 endfun
 
 
 fun! s:Global.backup_regions() abort
-    " Store a copy of the current regions.
+    " Store the positions of the current regions.
+    " Snapshots are lists of [l, L, a, b, dir], at most g:VM_undo_snapshots.
 
     let tick   = undotree().seq_cur
     let backup = b:VM_Backup
     let index  = index(backup.ticks, backup.last)
 
-    if index < len(backup.ticks) - 1
-        let backup.ticks = backup.ticks[:index]
+    "drop snapshots that can't be reached anymore
+    if index >= 0 && index < len(backup.ticks) - 1
+        for t in remove(backup.ticks, index + 1, -1)
+            call s:drop_snapshot(backup, t)
+        endfor
     endif
 
     call add(backup.ticks, tick)
-    let backup[tick] = { 'regions': deepcopy(s:R()), 'X': s:X() }
+    let backup[tick] = {'X': s:X(), 'regions':
+                \ map(copy(s:R()), '[v:val.l, v:val.L, v:val.a, v:val.b, v:val.dir]')}
     let backup.last = tick
+
+    "drop the oldest snapshots, undo will stop at the oldest one left
+    if g:VM_undo_snapshots > 0
+        while len(backup.ticks) > g:VM_undo_snapshots
+            call s:drop_snapshot(backup, remove(backup.ticks, 0))
+            let backup.first = backup.ticks[0]
+        endwhile
+    endif
+endfun
+
+
+fun! s:drop_snapshot(backup, tick) abort
+    " Remove a snapshot, unless its tick is still in the list.
+    if index(a:backup.ticks, a:tick) < 0 && has_key(a:backup, a:tick)
+        unlet a:backup[a:tick]
+    endif
 endfun
 
 
@@ -371,6 +612,7 @@ fun! s:Global.select_region(i) abort
     let R = s:R()[i]
     call cursor(R.cur_ln(), R.cur_col())
     call s:F.Scroll.restore()
+    call self.update_viewport()
     let s:v.index = R.index
     return R
 endfun
@@ -392,7 +634,19 @@ fun! s:Global.region_at_pos(...) abort
     " Return the region at position, or an empty dict if not found.
 
     let pos = a:0 ? s:F.pos2byte(a:1) : s:F.curs2byte()
-    if s:X() && !has_key(s:V.Bytes, pos) | return {} | endif
+    let n = s:X() ? self.map_count(s:V.Bytes, pos) : 1
+    if !n | return {} | endif
+
+    " in extend mode, a position of the bytes map that bisect() doesn't find
+    " is looked for in all regions, since they could overlap
+    if n == 1 && self.regions_sorted()
+        let i = self.bisect('B', pos - 1)
+        if i < len(s:R()) && s:R()[i].A <= pos
+            return s:R()[i]
+        elseif !s:X()
+            return {}
+        endif
+    endif
 
     for r in s:R()
         if pos >= r.A && pos <= r.B
@@ -413,6 +667,10 @@ fun! s:Global.nearest_region(...) abort
     if pos <= Rs[0].A  | return Rs[0]  | endif
     if pos >= Rs[-1].B | return Rs[-1] | endif
 
+    if self.regions_sorted()
+        return Rs[self.bisect('B', pos - 1)]
+    endif
+
     for r in Rs
         if pos <= r.B
             return r
@@ -421,6 +679,31 @@ fun! s:Global.nearest_region(...) abort
 endfun
 
 
+fun! s:Global.regions_sorted() abort
+    " Regions are sorted and don't overlap, unless they are waiting to be
+    " merged: only then can they be looked up with bisect().
+    return !s:v.merge && !s:v.find_all_overlap
+endfun
+
+
+fun! s:Global.bisect(key, pos) abort
+    " Index of the first region whose offset (A or B) is greater than pos.
+    " Regions must be sorted, and not overlapping if looking for B.
+
+    let Rs = s:R()
+    let [lo, hi] = [0, len(Rs)]
+    while lo < hi
+        let mid = (lo + hi) / 2
+        if Rs[mid][a:key] > a:pos
+            let hi = mid
+        else
+            let lo = mid + 1
+        endif
+    endwhile
+    return lo
+endfun
+
+
 fun! s:Global.reset_index() abort
     " Reset index to current region, 0, or max - 1.
 
@@ -441,11 +724,7 @@ endfun
 
 fun! s:Global.overlapping_regions(R) abort
     " Check if two regions are overlapping.
-
-    let B = range(a:R.A, a:R.B)
-    for b in B
-        if s:V.Bytes[b] > 1 | return 1 | endif
-    endfor
+    return self.map_overlaps(s:V.Bytes, a:R.A, a:R.B)
 endfun
 
 
@@ -471,7 +750,7 @@ endfun
 fun! s:Global.reset_byte_map(update) abort
     " Reset byte map for all regions.
 
-    let s:V.Bytes = {}
+    let s:V.Bytes = []
 
     if a:update
         for r in self.active_regions() | call r.update_bytes_map() | endfor
@@ -493,18 +772,16 @@ endfun
 
 fun! s:Global.remove_last_region(...) abort
     " Remove last region and reselect the previous one.
-    for r in s:R()
-        if r.id == ( a:0? a:1 : s:v.IDs_list[-1] )
-            call r.clear()
-            break
-        endif
-    endfor
+    let r = s:F.region_with_id(a:0? a:1 : s:v.IDs_list[-1])
+    if !empty(r)
+        call r.clear()
+    endif
 
     if s:F.should_quit()
         return vm#reset()
     else
         "reselect previous region
-        let i = a:0? (r.index > 0? r.index-1 : 0) : s:v.index
+        let i = a:0? (get(r, 'index', 0) > 0? r.index-1 : 0) : s:v.index
         return self.select_region(i)
     endif
 endfun
@@ -530,6 +807,25 @@ fun! s:Global.update_indices(...) abort
 endfun
 
 
+fun! s:Global.regions_index() abort
+    " Return the maps of regions by id and by line, in regions order.
+    " s:V.Index is emptied when regions are added, removed or moved, and it's
+    " rebuilt the first time it's needed after that.
+
+    if empty(s:V.Index)
+        let [ids, lines] = [{}, {}]
+        for r in s:R()
+            let ids[r.id] = r
+            if has_key(lines, r.l) | call add(lines[r.l], r)
+            else                   | let lines[r.l] = [r]
+            endif
+        endfor
+        let s:V.Index = {'ids': ids, 'lines': lines}
+    endif
+    return s:V.Index
+endfun
+
+
 fun! s:Global.update_region_patterns(pat) abort
     " Update the patterns for the appropriate regions.
 
@@ -564,24 +860,13 @@ endfun
 fun! s:Global.lines_with_regions(reverse, ...) abort
     " Find lines with regions.""
 
+    let index = self.regions_index().lines
     let lines = {}
-    for r in s:R()
-        "called for a specific line
-        if a:0 && r.l != a:1 | continue | endif
-
-        "add region index to indices for that line
-        let lines[r.l] = get(lines, r.l, [])
-        call add(lines[r.l], r.index)
-    endfor
-
-    for line in keys(lines)
-        "sort list so that lower indices are put farther in the list
-
-        if len(lines[line]) > 1
-            if a:reverse | call reverse(sort(lines[line], 'n'))
-            else         | call sort(lines[line], 'n')
-            endif
-        endif
+    for line in a:0 ? filter([a:1], 'has_key(index, v:val)') : keys(index)
+        "regions in a line are in order, so indices are already sorted
+        "if reversed, lower indices are put farther in the list
+        let lines[line] = map(copy(index[line]), 'v:val.index')
+        if a:reverse | call reverse(lines[line]) | endif
     endfor
     return lines
 endfun
@@ -590,14 +875,8 @@ endfun
 fun! s:Global.one_region_per_line() abort
     " Remove all regions in each line, except the first one.
 
-    let new_regions = []
-    let lines = []
-    for r in s:R()
-        if index(lines, r.l) < 0
-            call add(new_regions, r)
-            call add(lines, r.l)
-        endif
-    endfor
+    let index = self.regions_index().lines
+    let new_regions = filter(copy(s:R()), 'index[v:val.l][0] is v:val')
     call self.erase_regions()
     let s:V.Regions = new_regions
     call self.update_indices()
@@ -607,19 +886,9 @@ endfun
 fun! s:Global.reorder_regions() abort
     " Reorder regions, so that their byte offsets are consecutive.
 
-    let As = sort(map(copy(s:R()), 'v:val.A'), 'n')
-    let Regions = []
-    while 1
-        for r in s:R()
-            if r.A == As[0]
-                call add(Regions, r)
-                call remove(As, 0)
-                break
-            endif
-        endfor
-        if !len(As) | break | endif
-    endwhile
-    let s:V.Regions = Regions
+    " sort() is stable, regions with the same offset keep their order
+    let s:V.Regions = sort(copy(s:R()), { a, b -> a.A - b.A })
+    let s:V.Index = {}
     call self.update_indices()
     call self.reset_index()
 endfun
@@ -676,9 +945,51 @@ endfun
 fun! s:Global.remove_regions_by_id(list) abort
     " Remove a list of regions by id.
 
-    for id in a:list
-        call s:F.region_with_id(id).remove()
-    endfor
+    if empty(a:list) | return | endif
+    let ids = {}
+    for id in a:list | let ids[id] = 1 | endfor
+    call self.regions_from_list(
+                \ map(filter(copy(s:R()), '!has_key(ids, v:val.id)'), 'v:val.index'))
+endfun
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Tracking regions during edits
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+" When a command is run at each cursor in turn, the regions that follow must
+" be updated for the changes made at the previous ones. By default they are
+" shifted by the change in buffer size. With g:VM_anchor_regions, they are
+" anchored to the text with extmarks or text properties, and moved where the
+" anchors are; if an anchor has been deleted, the region is shifted instead.
+
+fun! s:Global.track_regions() abort
+    " Start tracking regions before running commands at cursors.
+    let s:v.track_size = s:F.size()
+    let s:v.anchored = g:VM_anchor_regions
+
+    if s:v.anchored
+        call vm#region#clear_anchors()
+        for r in s:R() | call r.anchor() | endfor
+    endif
+endfun
+
+
+fun! s:Global.track_region(r) abort
+    " Update a region for the changes made at the previous regions.
+    if !s:v.anchored || !a:r.from_anchor()
+        let change = s:F.size() - s:v.track_size
+        call a:r.shift(change, change)
+    endif
+endfun
+
+
+fun! s:Global.untrack_regions() abort
+    " Stop tracking regions, remove anchors.
+    if s:v.anchored
+        call vm#region#clear_anchors()
+        let s:v.anchored = 0
+    endif
 endfun
 
 
@@ -719,8 +1030,8 @@ endfun
 fun! s:Global.merge_maps(map) abort
     " Merge temporary and primary regions maps.
 
-    for b in keys(a:map)
-        let s:V.Bytes[b] = get(s:V.Bytes, b, 0) + a:map[b]
+    for [A, B, n] in a:map
+        call self.map_add(s:V.Bytes, A, B, n)
     endfor
     if empty(s:V.Bytes) | return {} | endif
     let pos = getpos('.')[1:2]
@@ -732,8 +1043,8 @@ endfun
 fun! s:Global.subtract_maps(map) abort
     " Subtract temporary map from primary region map.
 
-    for b in keys(a:map)
-        silent! unlet s:V.Bytes[b]
+    for [A, B, n] in a:map
+        call self.map_remove(s:V.Bytes, A, B, 1)
     endfor
     return self.merge_regions()
 endfun
@@ -742,27 +1053,202 @@ endfun
 fun! s:Global.rebuild_from_map(map, ...) abort
     " Rebuild regions from bytes map.
 
-    let By = sort(map(keys(a:map), 'str2nr(v:val)'), 'n')
-    if a:0
-        let [start, end] = a:1
-        call filter(By, 'v:val >= start && v:val <= end')
-    endif
-    let A = By[0] | let B = By[0]
+    let ranges = a:0 ? self.map_ranges(a:map, a:1[0], a:1[1])
+                \    : self.map_ranges(a:map)
 
     call self.erase_regions()
+    if empty(ranges) | return | endif
+
+    for [A, B] in ranges
+        call vm#region#new(0, A, B)
+    endfor
+endfun
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Regions map
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+" The regions map (s:V.Bytes) is a list of [start, end, count] segments,
+" sorted by offset and not overlapping: count is the number of regions that
+" cover the bytes between start and end. Its size depends on the number of
+" regions, not on the number of selected bytes.
+
 
-    for i in By[1:]
-        if i == B+1
-            let B = i
+fun! s:Global.map_add(map, A, B, ...) abort
+    " Add the bytes between offsets A and B to a regions map.
+    let [map, n] = [a:map, a:0 ? a:1 : 1]
+
+    " regions are mostly added in order, append if past the last segment
+    if empty(map) || map[-1][1] < a:A
+        return add(map, [a:A, a:B, n])
+    endif
+
+    let i = s:map_bisect(map, a:A)
+    let pos = a:A
+    while pos <= a:B
+        if i == len(map) || map[i][0] > a:B
+            call insert(map, [pos, a:B, n], i)
+            break
+        endif
+        let seg = map[i]
+        if seg[0] > pos
+            " fill the gap before the next segment
+            call insert(map, [pos, seg[0] - 1, n], i)
+            let [i, pos] = [i + 1, seg[0]]
+            continue
+        elseif seg[0] < pos
+            call insert(map, [seg[0], pos - 1, seg[2]], i)
+            let [i, seg[0]] = [i + 1, pos]
+        endif
+        if seg[1] > a:B
+            call insert(map, [a:B + 1, seg[1], seg[2]], i + 1)
+            let seg[1] = a:B
+        endif
+        let seg[2] += n
+        let [i, pos] = [i + 1, seg[1] + 1]
+    endwhile
+    return map
+endfun
+
+
+fun! s:Global.map_remove(map, A, B, all) abort
+    " Remove the bytes between offsets A and B from a regions map.
+    " If not all, only decrease the count of the covering segments.
+    let map = a:map
+    let i = s:map_bisect(map, a:A)
+    while i < len(map) && map[i][0] <= a:B
+        let seg = map[i]
+        if seg[0] < a:A
+            call insert(map, [seg[0], a:A - 1, seg[2]], i)
+            let [i, seg[0]] = [i + 1, a:A]
+        endif
+        if seg[1] > a:B
+            call insert(map, [a:B + 1, seg[1], seg[2]], i + 1)
+            let seg[1] = a:B
+        endif
+        let seg[2] = a:all ? 0 : seg[2] - 1
+        if seg[2] > 0 | let i += 1
+        else          | call remove(map, i)
+        endif
+    endwhile
+    return map
+endfun
+
+
+fun! s:Global.map_count(map, pos) abort
+    " Return the number of regions that include the byte at offset.
+    let i = s:map_bisect(a:map, a:pos)
+    return i < len(a:map) && a:map[i][0] <= a:pos ? a:map[i][2] : 0
+endfun
+
+
+fun! s:Global.map_overlaps(map, A, B) abort
+    " Check if any byte between offsets A and B belongs to more regions.
+    let i = s:map_bisect(a:map, a:A)
+    while i < len(a:map) && a:map[i][0] <= a:B
+        if a:map[i][2] > 1 | return 1 | endif
+        let i += 1
+    endwhile
+    return 0
+endfun
+
+
+fun! s:Global.map_ranges(map, ...) abort
+    " Return the list of [start, end] of contiguous bytes in the map,
+    " optionally clamped between two offsets.
+    let [start, end] = a:0 ? [a:1, a:2] : [0, 0]
+    let ranges = []
+    for [A, B, n] in a:map
+        if a:0
+            if B < start || A > end | continue | endif
+            let [A, B] = [max([A, start]), min([B, end])]
+        endif
+        if !empty(ranges) && A <= ranges[-1][1] + 1
+            let ranges[-1][1] = max([B, ranges[-1][1]])
         else
-            call vm#region#new(0, A, B)
-            let A = i | let B = i
+            call add(ranges, [A, B])
         endif
     endfor
-    call vm#region#new(0, A, B)
+    return ranges
+endfun
+
+
+fun! s:Global.map_from_ranges(ranges) abort
+    " Build a regions map from a list of [start, end] offsets.
+    let map = []
+    for [A, B] in a:ranges
+        call self.map_add(map, A, B)
+    endfor
+    return map
 endfun
 
 
+fun! s:map_bisect(map, pos) abort
+    " Index of the first segment that ends at or after offset.
+    let [lo, hi] = [0, len(a:map)]
+    while lo < hi
+        let mid = (lo + hi) / 2
+        if a:map[mid][1] < a:pos | let lo = mid + 1
+        else                     | let hi = mid
+        endif
+    endwhile
+    return lo
+endfun
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" lua section (functions here will overwrite previous ones)
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+
+if g:VM_use_lua
+
+" the lua module is namespaced, to not collide with other plugins
+let s:lua = 'require("visual_multi.regions").'
+
+fun! s:Global.rebuild_from_map(map, ...) abort
+    let regions = luaeval(s:lua . 'rebuild_from_map(_A[1], _A[2])',
+                \         [a:map, a:0 ? a:1 : []])
+    call self.erase_regions()
+    call self.regions_from_list(regions)
+endfun
+
+fun! s:Global.lines_with_regions(reverse, ...) abort
+    return luaeval(s:lua . 'lines_with_regions(_A[1], _A[2], _A[3])',
+                \  [map(copy(s:R()), '[v:val.l, v:val.index]'),
+                \   a:reverse ? v:true : v:false, a:0 ? a:1 : 0])
+endfun
+
+fun! s:Global.merge_cursors() abort
+    let pos = getpos('.')[1:2]
+    call self.regions_from_list(luaeval(s:lua . 'merge_cursors(_A)',
+                \                       map(copy(s:R()), 'v:val.A')))
+    return self.update_and_select_region(pos)
+endfun
+
+fun! s:Global.reorder_regions() abort
+    call self.regions_from_list(luaeval(s:lua . 'reorder_regions(_A)',
+                \                       map(copy(s:R()), 'v:val.A')))
+    call self.update_indices()
+    call self.reset_index()
+endfun
+
+fun! s:Global.one_region_per_line() abort
+    call self.regions_from_list(luaeval(s:lua . 'one_region_per_line(_A)',
+                \                       map(copy(s:R()), 'v:val.l')))
+endfun
+
+fun! s:Global.split_lines() abort
+    let positions = map(copy(s:R()), '[v:val.l, v:val.L, v:val.a, v:val.b]')
+    let active = map(copy(self.active_regions()), 'v:val.index')
+    call self.regions_from_list(luaeval(s:lua . 'split_lines(_A[1], _A[2])',
+                \                       [positions, active]))
+endfun
+
+endif
+
+
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 " python section (functions here will overwrite previous ones)
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
@@ -774,12 +1260,44 @@ fun! s:Global.rebuild_from_map(map, ...) abort
     let l:dict = a:map
     let l:range = a:0 ? a:1 : []
     python3 vm.py_rebuild_from_map()
+    call self.erase_regions()
+    call self.regions_from_list(l:regions)
 endfun
 
 fun! s:Global.lines_with_regions(reverse, ...) abort
     let l:specific_line = a:0 ? a:1 : 0
+    let l:regions = map(copy(s:R()), '[v:val.l, v:val.index]')
     python3 vm.py_lines_with_regions()
     return lines
 endfun
 
+fun! s:Global.merge_cursors() abort
+    let pos = getpos('.')[1:2]
+    let l:offsets = map(copy(s:R()), 'v:val.A')
+    python3 vm.py_merge_cursors()
+    call self.regions_from_list(l:regions)
+    return self.update_and_select_region(pos)
+endfun
+
+fun! s:Global.reorder_regions() abort
+    let l:offsets = map(copy(s:R()), 'v:val.A')
+    python3 vm.py_reorder_regions()
+    call self.regions_from_list(l:regions)
+    call self.update_indices()
+    call self.reset_index()
+endfun
+
+fun! s:Global.one_region_per_line() abort
+    let l:lines = map(copy(s:R()), 'v:val.l')
+    python3 vm.py_one_region_per_line()
+    call self.regions_from_list(l:regions)
+endfun
+
+fun! s:Global.split_lines() abort
+    let l:positions = map(copy(s:R()), '[v:val.l, v:val.L, v:val.a, v:val.b]')
+    let l:active = map(copy(self.active_regions()), 'v:val.index')
+    python3 vm.py_split_lines()
+    call self.regions_from_list(l:regions)
+endfun
+
 " vim: et sw=4 ts=4 sts=4 fdm=indent fdn=1
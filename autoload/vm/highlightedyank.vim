@@ -1,67 +1,50 @@
-" Integration with vim-highlightedyank plugin
-" Prevents interference during VM internal operations
+" Integration with vim-highlightedyank and other plugins that react to yanks
+" Prevents interference during VM internal operations, by ignoring the
+" TextYankPost event while they run
 
-" Check if highlightedyank plugin is available
-function! s:highlightedyank_available() abort
-    return exists('#highlightedyank#TextYankPost')
-endfunction
-
-" Store the original autocmd state
-let s:autocmd_was_enabled = 0
+let s:depth = 0
+let s:eventignore = ''
 
-" Disable highlightedyank TextYankPost autocmd
-function! s:disable_highlightedyank() abort
-    if s:highlightedyank_available()
-        autocmd! highlightedyank TextYankPost
-        let s:autocmd_was_enabled = 1
-        return 1
+" Start ignoring TextYankPost, until the matching vm#highlightedyank#end()
+" Scopes can be nested: a command that yanks at all regions can open a scope
+" once, so that the yanks inside it don't change options at every region
+function! vm#highlightedyank#begin() abort
+    let s:depth += 1
+    if s:depth == 1 && exists('##TextYankPost')
+        let s:eventignore = &eventignore
+        set eventignore+=TextYankPost
     endif
-    return 0
 endfunction
 
-" Re-enable highlightedyank TextYankPost autocmd
-function! s:enable_highlightedyank() abort
-    if s:autocmd_was_enabled
-        augroup highlightedyank
-            autocmd!
-            autocmd TextYankPost * call highlightedyank#debounce()
-        augroup END
-        let s:autocmd_was_enabled = 0
+" End the scope started by vm#highlightedyank#begin()
+function! vm#highlightedyank#end() abort
+    if s:depth == 0 | return | endif
+    let s:depth -= 1
+    if s:depth == 0 && exists('##TextYankPost')
+        let &eventignore = s:eventignore
     endif
 endfunction
 
-" Execute a command with highlightedyank temporarily disabled
+" Execute a command with TextYankPost ignored
 function! vm#highlightedyank#execute_silent(cmd) abort
-    let was_disabled = s:disable_highlightedyank()
+    if s:depth
+        execute a:cmd
+        return
+    endif
+    call vm#highlightedyank#begin()
     try
         execute a:cmd
     finally
-        if was_disabled
-            call s:enable_highlightedyank()
-        endif
+        call vm#highlightedyank#end()
     endtry
 endfunction
 
-" Execute normal mode command with highlightedyank temporarily disabled
+" Execute normal mode command with TextYankPost ignored
 function! vm#highlightedyank#normal_silent(cmd) abort
-    let was_disabled = s:disable_highlightedyank()
-    try
-        execute 'normal! ' . a:cmd
-    finally
-        if was_disabled
-            call s:enable_highlightedyank()
-        endif
-    endtry
+    call vm#highlightedyank#execute_silent('normal! ' . a:cmd)
 endfunction
 
-" Execute keepjumps normal command with highlightedyank temporarily disabled
+" Execute keepjumps normal command with TextYankPost ignored
 function! vm#highlightedyank#keepjumps_normal_silent(cmd) abort
-    let was_disabled = s:disable_highlightedyank()
-    try
-        execute 'keepjumps normal! ' . a:cmd
-    finally
-        if was_disabled
-            call s:enable_highlightedyank()
-        endif
-    endtry
-endfunction
\ No newline at end of file
+    call vm#highlightedyank#execute_silent('keepjumps normal! ' . a:cmd)
+endfunction
@@ -20,8 +20,7 @@ let s:X = { -> g:Vm.extend_mode }
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
 fun! vm#icmds#x(cmd) abort
-    let size = s:F.size()
-    let change = 0 | let s:v.eco = 1
+    let s:v.eco = 1
     if empty(s:v.storepos) | let s:v.storepos = getpos('.')[1:2] | endif
     let active = s:R()[s:V.Insert.index]
 
@@ -31,15 +30,16 @@ fun! vm#icmds#x(cmd) abort
     endif
     let s:v.last_icmd = a:cmd
 
+    call s:G.track_regions()
     for r in s:R()
         if s:v.single_region && r isnot active
             if r.l == active.l
-                call r.shift(change, change)
+                call s:G.track_region(r)
             endif
             continue
         endif
 
-        call r.shift(change, change)
+        call s:G.track_region(r)
         call s:F.Cursor(r.A)
 
         " we want to emulate the behaviour that <del> and <bs> have in insert
@@ -82,10 +82,8 @@ fun! vm#icmds#x(cmd) abort
             let w = strlen(@-)
             call r.shift(-w, -w)
         endif
-
-        "update changed size
-        let change = s:F.size() - size
     endfor
+    call s:G.untrack_regions()
 
     call s:G.merge_regions()
     call s:G.select_region(s:V.Insert.index)
@@ -99,13 +97,13 @@ endfun
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
 fun! vm#icmds#cw(ctrlu) abort
-    let size = s:F.size()
-    let change = 0 | let s:v.eco = 1
+    let s:v.eco = 1
     let s:v.storepos = getpos('.')[1:2]
     let keep_line = get(g:, 'VM_icw_keeps_line', 1)
 
+    call s:G.track_regions()
     for r in s:R()
-        call r.shift(change, change)
+        call s:G.track_region(r)
 
         "TODO: deletion to line above can be bugged for now
         if keep_line && r.a == 1 | continue | endif
@@ -130,10 +128,8 @@ fun! vm#icmds#cw(ctrlu) abort
             keepjumps normal! db
         endif
         call r.update_cursor_pos()
-
-        "update changed size
-        let change = s:F.size() - size
     endfor
+    call s:G.untrack_regions()
     call s:V.Insert.start(1)
 endfun
 
@@ -2,7 +2,7 @@
 " Insert class
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
-let s:Insert = {'index': -1, 'cursors': [], 'replace': 0, 'type': ''}
+let s:Insert = {'index': -1, 'lnums': [], 'replace': 0, 'type': ''}
 
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
@@ -85,7 +85,7 @@ fun! s:Insert.key(type) abort
             call s:G.change_mode()
             let s:v.direction = 1
         endif
-        for r in s:R() | call s:V.Edit.extra_spaces.add(r) | endfor
+        call s:add_extra_spaces()
         call vm#commands#motion('l', 1, 0, 0)
         call self.start(1)
 
@@ -108,7 +108,10 @@ fun! s:Insert.start(...) abort
     "used to track all changes from that point, to apply them on all cursors
 
     "--------------------------------------------------------------------------
-    call s:G.merge_cursors()
+    " regions are already up to date, unless some cursors must be merged
+    if s:v.eco || s:v.auto || s:overlapping_cursors()
+        call s:G.merge_cursors()
+    endif
 
     let I = self
     let I._index = get(I, '_index', -1)
@@ -117,49 +120,43 @@ fun! s:Insert.start(...) abort
 
     let I.index     = R.index
     let I.begin     = [R.l, R.a]
-    let I.cursors   = []
-    let I.lines     = {}
     let I.change    = 0         " text change, only if g:VM_live_editing
     let I.col       = col('.')
     let I.reupdate  = v:false   " set by InsertCharPre and CompleteDone
     let I.undojoin_count = 0    " track consecutive updates for undojoin
+    let I.timer     = 0         " pending update, see g:VM_live_editing_latency
 
     " remove current regions highlight
     call s:G.remove_highlight()
 
-    " create cursors and line objects
-    for r in s:R()
-        let C = s:Cursor.new(r.l, r.a)
-        call add(I.cursors, C)
+    " if cursor is at EOL/empty line, an extra space will be added
+    " if starting with keys 'a/A', spaces have been added already
+    if !a:0
+        call s:add_extra_spaces()
+    endif
 
-        " if cursor is at EOL/empty line, an extra space will be added
-        " if starting with keys 'a/A', spaces have been added already
-        if !a:0
-            call s:V.Edit.extra_spaces.add(r)
-        endif
+    " cursors are grouped by line, see 'Lines with cursors' below
+    call I.init_lines()
+    let I.nth = s:v.single_region ? 0 : I.index - I.first[s:line_index(I.index)]
 
-        if !has_key(I.lines, r.l)
-            let I.lines[r.l] = s:Line.new(r.l, C)
-            let nth = 0 | let C.nth = 0
-        else
-            if !s:v.single_region
-                let nth += 1
-            endif
-            let C.nth = nth
-            call add(I.lines[r.l].cursors, C)
-        endif
-        if C.index == I.index | let I.nth = C.nth | endif
-    endfor
+    " with many lines, offscreen lines are updated when typing stops
+    let I.viewport = g:VM_live_editing_viewport > 0 &&
+                \    len(I.lnums) > g:VM_live_editing_viewport
+    let I.pending  = []
 
     " create a backup of the original lines
     if self.replace && !exists('I._lines')
-        let I._lines = map(copy(I.lines), 'v:val.txt')
+        let I._lines = {}
+        for k in range(len(I.lnums))
+            let I._lines[I.lnums[k]] = I.txt[k]
+        endfor
     endif
 
     "start tracking text changes
     let s:v.insert = 1 | call I.auto_start()
 
     "change/update cursor highlight
+    for k in range(len(I.lnums)) | call I.highlight(k) | endfor
     call s:G.update_cursor_highlight()
 
     "start insert mode
@@ -240,7 +237,6 @@ fun! s:Insert.update_text(insert_leave) abort
     call vm#comp#TextChangedI()  "compatibility tweaks
 
     let I = self
-    let L = I.lines
 
     " this is the current cursor position
     let ln   = line('.')
@@ -286,15 +282,14 @@ fun! s:Insert.update_text(insert_leave) abort
 
     " update the lines (also the current line is updated with setline(), this
     " should ensure that the same text is entered everywhere)
-    if I.replace
-        let width = strwidth(text)
-        for l in sort(keys(L))
-            call L[l].replace(I.change, text, width)
-        endfor
+    " with many lines, only the lines in the window are updated now
+    if I.viewport && !a:insert_leave
+        let [i, j] = s:lines_in_window(I.lnums)
+        call I.update_lines(i, j, text)
+        let I.pending = [text, i, j]
     else
-        for l in sort(keys(L))
-            call L[l].update(I.change, text)
-        endfor
+        call I.update_lines(0, len(I.lnums), text)
+        let I.pending = []
     endif
 
     " put the cursor where it should stay after the lines update
@@ -303,6 +298,63 @@ fun! s:Insert.update_text(insert_leave) abort
 endfun
 
 
+fun! s:Insert.update_lines(i, j, text) abort
+    " Update the lines with cursors in the range [i, j) with the text inserted
+    " so far, consecutive lines with a single setline().
+    if a:i >= a:j | return | endif
+    let lines = []
+
+    if self.replace
+        let width = strwidth(a:text)
+        for k in range(a:i, a:j - 1)
+            call add(lines, self.replace_line(k, a:text, width))
+        endfor
+    else
+        for k in range(a:i, a:j - 1)
+            call add(lines, self.update_line(k, a:text))
+        endfor
+    endif
+
+    let i = 0
+    let lnums = self.lnums[a:i : a:j - 1]
+    while i < len(lnums)
+        let [ln, block] = [lnums[i], [lines[i]]]
+        let i += 1
+        while i < len(lnums) && lnums[i] == ln + len(block)
+            call add(block, lines[i])
+            let i += 1
+        endwhile
+        call setline(ln, block)
+    endwhile
+endfun
+
+
+fun! s:Insert.flush() abort
+    " Update the lines that were outside of the window while typing.
+    if empty(self.pending) | return | endif
+    let [text, i, j] = self.pending
+    let self.pending = []
+
+    if self.undojoin_count > 0
+        silent! undojoin
+    endif
+    call self.update_lines(0, i, text)
+    call self.update_lines(j, len(self.lnums), text)
+endfun
+
+
+fun! s:Insert.text_changed() abort
+    " Called on TextChangedI. With g:VM_live_editing_latency, changes that
+    " follow each other within that time are merged into a single update.
+    if g:VM_live_editing_latency <= 0 || !has('timers')
+        call self.update_text(0)
+    elseif !self.timer
+        let self.timer = timer_start(g:VM_live_editing_latency,
+                    \                { t -> s:merged_update() })
+    endif
+endfun
+
+
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 " Insert mode stop
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
@@ -316,36 +368,32 @@ fun! s:Insert.stop(...) abort
     " insert mode immediately after CompleteDone or abbreviation expansion
     " the only case we don't do this, it's when no characters are typed, nor
     " completion has been performed
+    " it's also done if an update was still waiting for its timer
+    if self.timer
+        call timer_stop(self.timer)
+        let self.timer = 0
+        let self.reupdate = v:true
+    endif
+
     if self.reupdate
         call self.update_text(1)
         let self.reupdate = v:false
+    else
+        call self.flush()
     endif
 
-    call self.clear_hi() | call self.auto_end() | let i = 0
-
-    if s:v.single_region
-        let active_line = 0
-        let s:cursors_after = []
-        for r in s:R()
-            let c = self.cursors[i]
-            if c.active
-                let active_line = c.l
-                call r.update_cursor([c.l, c._a])
-                let s:v.storepos = [r.l, r.a]
-            elseif active_line == c.l
-                call r.update_cursor([c.l, c._a])
-                call add(s:cursors_after, c)
-            endif
-            let i += 1
-        endfor
-    else
-        for r in s:R()
-            let c = self.cursors[i]
-            call r.update_cursor([c.l, c._a])
-            if r.index == self.index | let s:v.storepos = [r.l, r.a] | endif
-            let i += 1
+    call self.clear_hi() | call self.auto_end()
+
+    " the new positions of the cursors, regions are created again from them
+    " after going back one char, unless insert mode is restarted
+    let pos = []
+    for k in range(len(self.lnums))
+        let ln = self.lnums[k]
+        for col in self.columns(k)
+            call add(pos, [ln, s:fix_col(ln, col)])
         endfor
-    endif
+    endfor
+    let s:v.storepos = copy(pos[self.index])
 
     " NOTE:
     " - s:v.insert is true if re-entering insert mode after BS/CR/arrows etc;
@@ -355,7 +403,11 @@ fun! s:Insert.stop(...) abort
     "   insert mode to update cursors, and enter it again; it is set in plugs,
     "   to avoid postprocessing.
 
-    if s:v.restart_insert | let s:v.restart_insert = 0 | return | endif
+    if s:v.restart_insert
+        call s:rebuild_regions(pos)
+        let s:v.restart_insert = 0
+        return
+    endif
 
     " reset insert mode variables
     let s:v.eco    = 1
@@ -364,7 +416,8 @@ fun! s:Insert.stop(...) abort
     silent! unlet s:v.last_icmd
     let self.undojoin_count = 0
 
-    call s:step_back()
+    call s:step_back(pos)
+    call s:rebuild_regions(pos)
     call s:V.Edit.post_process(0,0)
 
     let &l:indentkeys   = s:v.indentkeys
@@ -414,152 +467,162 @@ endfun
 
 fun! s:Insert.clear_hi() abort
     " Clear cursors highlight.
-    for c in self.cursors
-        silent! call matchdelete(c.hl)
+    for ids in self.hl
+        for id in ids | silent! call matchdelete(id) | endfor
     endfor
 endfun
 
 
 
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
-" Cursor class
+" Lines with cursors
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
-let s:Cursor = {}
-
 "--------------------------------------------------------------------------
 
 "in Insert Mode we will forget about the regions, and work with cursors at
-"positions; from the final positions, we'll update the real regions later
+"positions; from the final positions, we'll create the real regions later
 
-"--------------------------------------------------------------------------
+"the k-th line with cursors has:
+"   I.lnums[k]  the line number
+"   I.txt[k]    the initial text of the line, when insert mode starts
+"   I.cols[k]   the initial columns of its cursors
+"   I.first[k]  the index of the region of its first cursor
+"   I.hl[k]     the ids of the matches that highlight its cursors
 
+"--------------------------------------------------------------------------
 
-fun! s:Cursor.new(ln, col) abort
-    " Create new cursor.
-    let C        = copy(self)
-    let C.index  = len(s:Insert.cursors)
-    let C.txt    = ''
-    let C.l      = a:ln
-    let C.L      = a:ln
-    let C.a      = a:col
-    let C._a     = C.a
-    let C.active = ( C.index == s:Insert.index )
-    let C.hl     = matchaddpos('MultiCursor', [[C.l, C.a]], 1001)
 
-    return C
+fun! s:Insert.init_lines() abort
+    " Group the cursors by line. Regions are sorted, so that cursors in the
+    " same line are next to each other.
+    let [self.lnums, self.txt, self.cols, self.first, self.hl] = [[], [], [], [], []]
+    let Rs = s:R()
+    for i in range(len(Rs))
+        let r = Rs[i]
+        if i && r.l == Rs[i - 1].l
+            call add(self.cols[-1], r.a)
+            continue
+        endif
+        call add(self.lnums, r.l)
+        call add(self.txt, getline(r.l))
+        call add(self.cols, [r.a])
+        call add(self.first, i)
+        call add(self.hl, [])
+    endfor
 endfun
 
 
-fun! s:Cursor.update(ln, change) abort
-    " Update cursor position and highlight.
-    let C = self
-    let C._a = C.a + a:change
-
-    silent! call matchdelete(C.hl)
-    let C.hl  = matchaddpos('MultiCursor', [[C.l, C._a]], 1001)
+fun! s:Insert.columns(k) abort
+    " Current columns of the cursors in the k-th line with cursors.
+    "
+    " When created, cursors are relative to normal mode, and each cursor is
+    " pushed forward by the text inserted by itself and by the cursors behind
+    " it in the same line. In single region mode, only the active cursor
+    " inserts text.
+    let [cols, change] = [self.cols[a:k], self.change]
+    if !s:v.single_region
+        return map(copy(cols), 'v:val + (v:key + 1) * change')
+    endif
+    let nth = self.index - self.first[a:k]
+    if nth < 0 || nth >= len(cols)
+        return copy(cols)
+    endif
+    return map(copy(cols), 'v:key < nth ? v:val : v:val + change')
 endfun
 
 
-
-""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
-" Line class
-""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
-
-let s:Line = {}
-
-
-fun! s:Line.new(line, cursor) abort
-    " Line object constructor.
-    let L         = copy(self)
-    let L.l       = a:line
-    let L.txt     = getline(a:line)
-    let L.cursors = [a:cursor]
-    return L
+fun! s:Insert.highlight(k) abort
+    " Highlight all cursors in the k-th line, with as few matches as possible
+    " (older vim versions accept at most 8 positions in a match).
+    for id in self.hl[a:k] | silent! call matchdelete(id) | endfor
+    let ln = self.lnums[a:k]
+    let pos = map(self.columns(a:k), '[ln, v:val]')
+    let self.hl[a:k] = map(range(0, len(pos) - 1, 8),
+                \ "matchaddpos('MultiCursor', pos[v:val : v:val + 7], 1001)")
 endfun
 
 
-fun! s:Line.update(change, text) abort
-    " Update a line in insert mode.
-    let text     = self.txt
-    let I        = s:V.Insert
+fun! s:Insert.update_line(k, text) abort
+    " Update the cursors in the k-th line in insert mode, return the new line.
+    let text     = self.txt[a:k]
+    let first    = self.first[a:k]
     let extraChg = 0  " cumulative change for additional cursors in same line
 
-    " self.txt is the initial text of the line, when insert mode starts
+    " self.txt[k] is the initial text of the line, when insert mode starts
     " it is not updated: the new text will be inserted inside of it
     " 'text' is the updated content of the line
 
-    " self.cursors are the cursors in this line
-
-    " when created, cursors are relative to normal mode, but in insert mode
-    " 1 must be subtracted from their column (c.a)
-
-    " a:change is the length of the text inserted by the main cursor
+    " a:text is the text inserted by the main cursor, self.change its length
     " if there are more cursors in the same line, changes add up (== extraChg)
 
     " to sum it up, if:
     "     t1 is the original line, before the insertion point
     "     t2 is the original line, after the insertion point
-    "     // is the insertion point (== c.a - 1 + nth*a:change)
+    "     // is the insertion point (== a - 1 + nth*change)
     "     \\ is the end of the inserted text
     " then:
     "     line = t1 // inserted text \\ t2
 
-    for c in self.cursors
-        if s:v.single_region && !c.active
-            call c.update(self.l, extraChg)
+    let cols = self.cols[a:k]
+    for j in range(len(cols))
+        let [a, ix] = [cols[j], first + j]
+        if s:v.single_region && ix != self.index
             continue
         endif
 
         let inserted = exists('s:v.smart_case_change') ?
-                    \ s:smart_case_change(c, a:text) : a:text
+                    \ s:smart_case_change(ix, a:text) : a:text
 
-        if c.a > 1
-            let insPoint = c.a + extraChg - 1
+        if a > 1
+            let insPoint = a + extraChg - 1
             let t1 = text[ 0 : (insPoint - 1) ]
             let t2 = text[ insPoint : ]
             let text = t1 . inserted . t2
-            " echo strtrans(t1) . "█" . strtrans(inserted) . "█" . strtrans(t2)
         else
-            " echo "█" . strtrans(inserted) . "█" . strtrans(text)
             let text = inserted . text
         endif
 
         " increase the cumulative extra change
-        let extraChg += a:change
-        call c.update(self.l, extraChg)
+        let extraChg += self.change
 
-        " c._a is the updated cursor position, c.a stays the same
-        if c.active | let I.col = c._a | endif
+        " the active cursor is pushed by the cursors behind it
+        if ix == self.index | let self.col = a + extraChg | endif
     endfor
 
-    call setline(self.l, text)
+    call self.highlight(a:k)
+    return text
 endfun
 
 
-fun! s:Line.replace(change, replacementText, width) abort
-    " Update a line in replace mode.
-    let c        = self.cursors[0]         " there's a single cursor in replace mode
-    let original = s:Insert._lines[self.l] " the original line
-    let replaced = a:replacementText       " the typed replacement
+fun! s:Insert.replace_line(k, replacementText, width) abort
+    " Update the cursor in the k-th line in replace mode, return the new line.
+    let ln       = self.lnums[a:k]
+    let a        = self.cols[a:k][0]     " there's a single cursor in replace mode
+    let ix       = self.first[a:k]
+    let original = self._lines[ln]      " the original line
+    let replaced = a:replacementText    " the typed replacement
 
-    if c.a > 1
-        let t1 = strpart(getline(c.l), 0, c.a - 1)
+    if a > 1
+        let t1 = strpart(getline(ln), 0, a - 1)
         let t2 = strcharpart(original, strwidth(t1) + a:width)
         let text = t1 . replaced . t2
     else
         let text = replaced . strcharpart(original, a:width)
     endif
 
-    call c.update(self.l, a:change)
-
-    " c._a is the updated cursor position, c.a stays the same
-    if c.active | let s:Insert.col = c._a | endif
-    call setline(self.l, text)
+    let col = a + self.change
+    if ix == self.index | let self.col = col | endif
+    call self.highlight(a:k)
 
-    if c._a >= col([c.l, '$'])
-        call s:V.Edit.extra_spaces.add(c, 1)
+    " the line is set by the caller, so the extra space at EOL is added here
+    if col > len(text)
+        let text .= ' '
+        if index(s:v.extra_spaces, ix) < 0
+            call add(s:v.extra_spaces, ix)
+        endif
     endif
+    return text
 endfun
 
 
@@ -573,7 +636,8 @@ fun! s:Insert.auto_start() abort
     augroup VM_insert
         au!
         au InsertCharPre <buffer> call s:Insert_char_pre()
-        au TextChangedI  <buffer> call b:VM_Selection.Insert.update_text(0)
+        au TextChangedI  <buffer> call b:VM_Selection.Insert.text_changed()
+        au CursorHoldI   <buffer> call b:VM_Selection.Insert.flush()
         au InsertLeave   <buffer> call b:VM_Selection.Insert.stop()
         au CompleteDone  <buffer> let b:VM_Selection.Insert.reupdate = v:true
     augroup END
@@ -601,13 +665,13 @@ endfun
 " Helpers
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
-fun! s:smart_case_change(cursor, txt) abort
+fun! s:smart_case_change(index, txt) abort
     " the active cursor isn't affected, text is entered as typed
-    if a:cursor.active
+    if a:index == s:Insert.index
         return a:txt
     endif
     try
-        let original = s:v.changed_text[a:cursor.index]
+        let original = s:v.changed_text[a:index]
         if match(original, '\u') >= 0 && match(original, '\U') < 0
             return toupper(a:txt)
         elseif match(original, '\u') == 0
@@ -621,6 +685,32 @@ fun! s:smart_case_change(cursor, txt) abort
 endfun
 
 
+fun! s:merged_update() abort
+    " Update the text after the changes merged by Insert.text_changed().
+    if s:F.not_VM() || !s:V.Insert.timer | return | endif
+    let s:V.Insert.timer = 0
+    if mode() =~# '^[iR]'
+        call s:V.Insert.update_text(0)
+    endif
+endfun
+
+
+fun! s:lines_in_window(lnums) abort
+    " Return the range [i, j) of the sorted line numbers that are in the window.
+    let [top, bot] = [line('w0'), line('w$')]
+    let [i, j] = [0, len(a:lnums)]
+    while i < j
+        let m = (i + j) / 2
+        if a:lnums[m] < top | let i = m + 1 | else | let j = m | endif
+    endwhile
+    let j = i
+    while j < len(a:lnums) && a:lnums[j] <= bot
+        let j += 1
+    endwhile
+    return [i, j]
+endfun
+
+
 fun! s:cur_char_bytes()
     " Bytesize of character under cursor
     return strlen(matchstr(getline('.'), '\%' . col('.') . 'c.'))
@@ -636,23 +726,71 @@ fun! s:do_reindent() abort
 endfun
 
 
-fun! s:step_back() abort
+fun! s:step_back(pos) abort
     " Go back one char after exiting insert mode, as vim does.
     if s:v.single_region && s:Insert.type ==? 'i'
         return
     endif
 
-    for r in s:v.single_region ? [s:R()[s:Insert.index]] : s:R()
-        if r.a != col([r.l, '$']) && r.a > 1
-            " move one byte back
-            call r.shift(-1,-1)
-            " fix column in case of multibyte chars by using a motion
-            call r.move('lh')
+    for p in s:v.single_region ? [a:pos[s:Insert.index]] : a:pos
+        let line = getline(p[0])
+        if p[1] != len(line) + 1 && p[1] > 1
+            " move back by the size of the previous character
+            let p[1] -= len(matchstr(line[: p[1] - 2], '.$'))
+        endif
+    endfor
+endfun
+
+
+fun! s:rebuild_regions(pos) abort
+    " Replace the regions with cursors at the [line, col] positions, that
+    " are sorted and as many as the regions.
+    let [eco, s:v.eco] = [s:v.eco, 1]
+    call s:G.erase_regions()
+    let s:v.IDs_list = []
+    call vm#region#new_list(map(a:pos, '[v:val[0], v:val[0], v:val[1], v:val[1], ""]'))
+    let s:v.eco = eco
+endfun
+
+
+fun! s:line_index(index) abort
+    " Index of the line with cursors of the region with index a:index.
+    let [lnums, ln] = [s:Insert.lnums, s:R()[a:index].l]
+    let [i, j] = [0, len(lnums)]
+    while i < j
+        let m = (i + j) / 2
+        if lnums[m] < ln | let i = m + 1 | else | let j = m | endif
+    endwhile
+    return i
+endfun
+
+
+fun! s:fix_col(ln, col) abort
+    " Keep the cursor column inside the line, as regions do.
+    let eol = col([a:ln, '$']) - 1 + s:v.multiline
+    return a:col > eol ? max([eol, 1]) : a:col
+endfun
+
+
+fun! s:add_extra_spaces() abort
+    " Add extra spaces for cursors at EOL or in empty lines. Regions are
+    " sorted, only the last one in a line can be there.
+    let Rs = s:R()
+    for i in range(len(Rs))
+        if i + 1 == len(Rs) || Rs[i + 1].l != Rs[i].l
+            call s:V.Edit.extra_spaces.add(Rs[i])
         endif
     endfor
 endfun
 
 
+fun! s:overlapping_cursors() abort
+    " True if more cursors are at the same position.
+    let offsets = map(copy(s:R()), 'v:val.A')
+    return len(uniq(offsets)) < len(s:R())
+endfun
+
+
 fun! s:map_single_mode(stop) abort
     " If single_region is active, map Tab to cycle regions.
     if !s:v.single_region || !get(g:, 'VM_single_mode_maps', 1) | return | endif
@@ -0,0 +1,294 @@
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Motions
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Some simple motions of cursors (h, l, j, k, 0, ^, $, w, b, e, W, B, E, f, t,
+" F, T) can be computed from the text of the lines, without moving the cursor
+" and running a normal command at each region. Cursors end up where
+" Region.move() would have left them.
+"
+" vm#motions#move() returns 0 when the motion can't be handled this way, and
+" nothing has been moved: the caller will then move each region. Regions in
+" lines with composing characters, or crossing closed folds, are still moved
+" one by one with Region.move(). So are w, b and e in lines with characters
+" that Vim puts in word classes of their own (CJK, emoji...).
+
+fun! vm#motions#init() abort
+    let s:V = b:VM_Selection
+    let s:v = s:V.Vars
+endfun
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Lambdas
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+let s:X = { -> g:Vm.extend_mode }
+
+" characters that w/b/e see as blanks, and the other ones
+let s:blank = '[ \t\u00a0\u1680\u2000-\u200b\u2028\u2029\u202f\u205f\u3000]'
+let s:nonblank = '\%(' . s:blank . '\@!.\)'
+
+" characters with a word class other than blank, punctuation and keyword
+let s:special = '[^\x01-\u206f]\|[\u203c\u2049]'
+
+" pattern for the characters of a class, WORDs have a single class
+let s:run = { class, big -> big ? s:nonblank :
+            \ class == 1 ? '\%(\k\@!' . s:nonblank . '\)' : '\k' }
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Move cursors
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! vm#motions#move(regions) abort
+    " Move the cursors in the list a:regions by the current motion.
+    if !g:VM_text_engine || s:X() || s:v.multiline || s:v.insert | return 0 | endif
+
+    let [n, key] = matchlist(s:v.motion, '^\(\d*\)\(.*\)$')[1:2]
+    let n = max([str2nr(n), 1])
+    let key = key == '_' && n == 1 ? '^' : key
+
+    if key =~# '^[hlwbeWBE]$'
+        let Target = function('s:' . tolower(key), [n, key =~# '\u'])
+    elseif key =~# '^[jk]$'
+        if &list | return 0 | endif
+        let Target = function('s:vertical', [key ==# 'j' ? n : -n])
+    elseif key =~# '^[0^$]$' || key ==# "\<End>"
+        if n > 1 | return 0 | endif
+        let Target = function('s:line_col', [key])
+    elseif key =~# '^[fFtT].$' && key[1:] !~ '[[:cntrl:]]'
+        let Target = function('s:find', [n, key[0], key[1:]])
+        call setcharsearch({'char': key[1:], 'forward': key[0] =~# '\l',
+                    \       'until': key[0] ==? 't'})
+    else
+        return 0
+    endif
+
+    let words = key =~# '^[web]$'
+    let [lines, moved, positions] = [{}, [], []]
+    for r in a:regions
+        if !has_key(lines, r.l)
+            let lines[r.l] = s:getline(r.l, words)
+        endif
+        let text = lines[r.l]
+        " a cursor moved by Region.move() can be left on the last byte of a
+        " multibyte character at the end of the line
+        if text isnot v:null && char2nr(text[r.a - 1]) > 0x7f
+            let r.a = s:char_start(text, r.a)
+        endif
+        let pos = text is v:null ? [] : Target(r, text)
+        if empty(pos)
+            call r.move()
+        else
+            call add(moved, r)
+            call add(positions, pos)
+        endif
+    endfor
+    call vm#region#update_cursors(moved, positions)
+    return 1
+endfun
+
+
+fun! s:getline(ln, ...) abort
+    " Text of a line, or v:null if it has composing characters, or if a:1 is
+    " true and it has characters with a special word class.
+    let text = getline(a:ln)
+    if text =~ '[^\x01-\x7f]' && (strchars(text) != strchars(text, 1) ||
+                \                   a:0 && a:1 && text =~ s:special)
+        return v:null
+    endif
+    return text
+endfun
+
+
+fun! s:class(text, i, big) abort
+    " Word class of the character at byte index i, as used by w/b/e: 0 for
+    " blanks and the end of the line, 2 for keyword characters, 1 for others.
+    let c = matchstr(a:text, '.', a:i)
+    return c == '' || c =~ s:blank ? 0 : a:big || c !~ '\k' ? 1 : 2
+endfun
+
+
+fun! s:next(text, i) abort
+    " Byte index of the character after the one at byte index i.
+    return a:i + max([len(matchstr(a:text, '.', a:i)), 1])
+endfun
+
+
+fun! s:prev(text, i) abort
+    " Byte index of the character before byte index i.
+    return a:i - len(matchstr(strpart(a:text, 0, a:i), '.$'))
+endfun
+
+
+fun! s:last(text) abort
+    " Column of the last character of a line, 1 if the line is empty.
+    return max([s:prev(a:text, len(a:text)) + 1, 1])
+endfun
+
+
+fun! s:char_start(text, col) abort
+    " Column of the first byte of the character at column col, as cursor()
+    " would set it.
+    return match(a:text, '.\%>' . a:col . 'c') + 1
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Horizontal motions
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Cursors can't leave their line: a motion that would end in another line
+" leaves the cursor at the end of the line (if going forward) or at its start.
+" Each function takes the region and the text of its line, and returns the
+" new [line, column] of the cursor. Byte indices in the text (i) are 0-based,
+" and always at the start of a character.
+
+fun! s:h(n, big, r, text) abort
+    let r = a:r | let r.vcol = 0
+    let before = strpart(a:text, 0, r.a - 1)
+    let n = max([strchars(before) - a:n, 0])
+    return [r.l, strlen(strcharpart(before, 0, n)) + 1]
+endfun
+
+
+fun! s:l(n, big, r, text) abort
+    let r = a:r | let r.vcol = 0
+    let after = strpart(a:text, r.a - 1)
+    let n = min([a:n, max([strchars(after) - 1, 0])])
+    return [r.l, r.a + strlen(strcharpart(after, 0, n))]
+endfun
+
+
+fun! s:w(n, big, r, text) abort
+    " Start of the n-th next word.
+    let r = a:r | let r.vcol = 0
+    let [text, i, eol] = [a:text, r.a - 1, [r.l, s:last(a:text)]]
+
+    for _ in range(a:n)
+        let class = s:class(text, i, a:big)
+        let run = class ? s:run(class, a:big) . '\+' : ''
+        let i = matchend(text, run . s:blank . '*', i)
+        if i >= len(text) | return eol | endif
+    endfor
+    return [r.l, i + 1]
+endfun
+
+
+fun! s:e(n, big, r, text) abort
+    " End of the n-th next word.
+    let r = a:r | let r.vcol = 0
+    let [text, i, eol] = [a:text, r.a - 1, [r.l, s:last(a:text)]]
+
+    for _ in range(a:n)
+        let class = s:class(text, i, a:big)
+        let i = s:next(text, i)
+        if i >= len(text) | return eol | endif
+        if !class || s:class(text, i, a:big) != class
+            let i = matchend(text, s:blank . '*', i)
+            if i >= len(text) | return eol | endif
+            let class = s:class(text, i, a:big)
+        endif
+        let i = s:prev(text, matchend(text, s:run(class, a:big) . '\+', i))
+    endfor
+    return [r.l, i + 1]
+endfun
+
+
+fun! s:b(n, big, r, text) abort
+    " Start of the n-th previous word.
+    let r = a:r | let r.vcol = 0
+    let [text, i] = [a:text, r.a - 1]
+
+    for _ in range(a:n)
+        let i = match(strpart(text, 0, i), s:blank . '*$')
+        if i <= 0 | return [r.l, 1] | endif
+        let run = s:run(s:class(text, s:prev(text, i), a:big), a:big)
+        let i = match(strpart(text, 0, i), run . '\+$')
+    endfor
+    return [r.l, i + 1]
+endfun
+
+
+fun! s:line_col(key, r, text) abort
+    " 0, ^ and $: the first non-blank is the last character of blank lines.
+    let r = a:r | let r.vcol = 0
+    let last = s:last(a:text)
+    if a:key ==# '0'     | return [r.l, 1]
+    elseif a:key ==# '^' | return [r.l, min([matchend(a:text, '^\s*') + 1, last])]
+    else                 | return [r.l, last]
+    endif
+endfun
+
+
+fun! s:find(n, key, char, r, text) abort
+    " f, F, t, T: the cursor doesn't move if the character isn't found.
+    let r = a:r | let r.vcol = 0
+    let [text, i] = [a:text, r.a - 1]
+    let forward = a:key =~# '\l'
+
+    for _ in range(a:n)
+        let i = forward ? stridx(text, a:char, i + 1) :
+                    \ i > 0 ? strridx(text, a:char, i - 1) : -1
+        if i < 0 | return [r.l, r.a] | endif
+    endfor
+    let i = a:key ==# 't' ? s:prev(text, i) : a:key ==# 'T' ? s:next(text, i) : i
+    return [r.l, i + 1]
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Vertical motions
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! s:vertical(n, r, text) abort
+    " j, k: the cursor lands where the normal command would put it, then the
+    " column is adjusted by the vertical column of the region, as done by
+    " s:Region.set_vcol() and s:keep_vertical_col() in region.vim, that count
+    " the bytes of the line up to the first byte of the cursor character.
+    let r = a:r
+    let ln = min([max([r.l + a:n, 1]), line('$')])
+    for l in range(min([r.l, ln]), max([r.l, ln]))
+        if foldclosed(l) > 0 | return [] | endif
+    endfor
+    let text = ln == r.l ? a:text : s:getline(ln)
+    if text is v:null | return [] | endif
+
+    if !r.vcol
+        let before = a:text[:r.a - 1]
+        let r.bdiff = strlen(before) - strchars(before)
+        let r.vcol = r.a
+        if !&expandtab
+            let r.ntabs = count(before, "\t")
+        endif
+    endif
+
+    " the virtual column of the cursor: where its character starts, or the
+    " end of a tab in normal mode
+    let char = matchstr(a:text, '.', r.a - 1)
+    let want = char == "\t" ? strdisplaywidth(strpart(a:text, 0, r.a))
+                \            : strdisplaywidth(strpart(a:text, 0, r.a - 1)) + 1
+    if ln == r.l
+        let col = r.a
+    else
+        let col = match(text, '\%<' . (want + 1) . 'v.\%>' . want . 'v') + 1
+        let col = col ? col : len(text) + 1
+    endif
+
+    let before = text[:col - 1]
+    let vcol = r.vcol - r.bdiff + strlen(before) - strchars(before)
+    let endline = max([len(text), 1])
+    if !&expandtab
+        let tabsdiff = count(before, "\t") - r.ntabs
+        let vcol -= &tabstop * tabsdiff - tabsdiff
+    endif
+
+    if vcol < endline
+        let col = vcol > 0 ? s:char_start(text, vcol) : col
+    elseif r.a < endline || col > len(text)
+        let col = s:last(text)
+    endif
+    return [ln, col]
+endfun
+
+" vim: et ts=4 sw=4 sts=4 :
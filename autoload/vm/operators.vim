@@ -301,30 +301,35 @@ fun! vm#operators#find(start, visual, ...) abort
 
     let ows = &wrapscan
     set nowrapscan
-    call vm#highlightedyank#execute_silent('silent keepjumps normal! ygn')
-    if s:vblock
-        let R = getpos('.')[2]
-        if !( R < startcol || R > endcol )
+    call vm#highlightedyank#begin()
+    try
+        call vm#highlightedyank#execute_silent('silent keepjumps normal! ygn')
+        if s:vblock
+            let R = getpos('.')[2]
+            if !( R < startcol || R > endcol )
+                call s:G.new_region()
+            endif
+        else
             call s:G.new_region()
         endif
-    else
-        call s:G.new_region()
-    endif
 
-    while 1
-        if !search(join(s:v.search, '\|'), 'znp', endline) | break | endif
-        call vm#highlightedyank#execute_silent('silent keepjumps normal! nygn')
-        if getpos("'[")[1] > endline
-            break
-        elseif s:vblock
-            let R = getpos('.')[2]
-            if ( R < startcol || R > endcol )
-                continue
+        while 1
+            if !search(join(s:v.search, '\|'), 'znp', endline) | break | endif
+            call vm#highlightedyank#execute_silent('silent keepjumps normal! nygn')
+            if getpos("'[")[1] > endline
+                break
+            elseif s:vblock
+                let R = getpos('.')[2]
+                if ( R < startcol || R > endcol )
+                    continue
+                endif
             endif
-        endif
-        call s:G.new_region()
-    endwhile
-    let &wrapscan = ows
+            call s:G.new_region()
+        endwhile
+    finally
+        let &wrapscan = ows
+        call vm#highlightedyank#end()
+    endtry
     call s:merge_find()
 endfun
 
@@ -351,7 +356,8 @@ fun! s:backup_map_find() abort
     call s:init()
     let s:Bytes = copy(s:V.Bytes)
     let s:V.Regions = []
-    let s:V.Bytes = {}
+    let s:V.Bytes = []
+    let s:V.Index = {}
     let s:v.index = -1
     let s:v.no_search = 1
     let s:v.eco = 1
@@ -0,0 +1,99 @@
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Profiling of the slowest VM functions, enabled by g:VM_profile
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+" The functions are wrapped the first time VM starts, and their calls are
+" counted and timed, grouped by the number of regions at the time of the call.
+" Times are cumulative, they include the time spent in nested calls.
+
+let s:functions = {
+            \ 'Global': ['update_and_select_region', 'update_highlight',
+            \            'get_all_regions', 'rebuild_from_map', 'backup_regions'],
+            \ 'Edit':   ['process'],
+            \ 'Insert': ['update_text'],
+            \ 'Region': ['update_content'],
+            \}
+
+let s:data = {}
+let s:wrapped = 0
+
+
+fun! vm#profile#start() abort
+    " Wrap the profiled functions, once.
+    if s:wrapped | return | endif
+    let s:wrapped = 1
+
+    let classes = {
+                \ 'Global': b:VM_Selection.Global,
+                \ 'Edit':   b:VM_Selection.Edit,
+                \ 'Insert': b:VM_Selection.Insert,
+                \ 'Region': vm#region#class(),
+                \}
+    for [class, names] in items(s:functions)
+        for name in names
+            call s:wrap(classes[class], name, class . '.' . name)
+        endfor
+    endfor
+endfun
+
+
+fun! vm#profile#report(clear, file) abort
+    " Show the report and write it to a json file, or clear collected data.
+    if !g:VM_profile
+        echo '[visual-multi] set g:VM_profile to enable profiling'
+        return
+    elseif a:clear
+        let s:data = {}
+        return
+    elseif empty(s:data)
+        echo '[visual-multi] nothing has been profiled yet'
+        return
+    endif
+
+    let entries = sort(values(s:data), { a, b -> a.seconds < b.seconds ? 1 : -1 })
+    let file = empty(a:file) ? tempname() . '.json' : fnamemodify(a:file, ':p')
+    call writefile([json_encode(entries)], file)
+
+    let lines = [printf('%-36s %8s %8s %10s %10s',
+                \       'function', 'regions', 'calls', 'total', 'average')]
+    for e in entries
+        call add(lines, printf('%-36s %7d+ %8d %9.3fs %9.4fs', e.function,
+                    \           e.regions, e.calls, e.seconds, e.seconds / e.calls))
+    endfor
+    echo join(lines, "\n") . "\n\nwritten to " . file
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! s:wrap(class, name, label) abort
+    " Replace a method with one that calls and times the original one.
+    let Original = a:class[a:name]
+    let label = a:label
+
+    fun! a:class[a:name](...) abort dict closure
+        let n = exists('b:VM_Selection') ? len(b:VM_Selection.Regions) : 0
+        let t = reltime()
+        try
+            return call(Original, a:000, self)
+        finally
+            call s:record(label, n, reltimefloat(reltime(t)))
+        endtry
+    endfun
+endfun
+
+
+fun! s:record(label, n, seconds) abort
+    " Add a call to the data, the number of regions is rounded to 1, 10, 100...
+    let regions = a:n ? str2nr('1' . repeat('0', len(a:n) - 1)) : 0
+    let key = a:label . ':' . regions
+    if !has_key(s:data, key)
+        let s:data[key] = {'function': a:label, 'regions': regions,
+                    \      'calls': 0, 'seconds': 0.0}
+    endif
+    let s:data[key].calls += 1
+    let s:data[key].seconds += a:seconds
+endfun
+
+" vim: et ts=4 sw=4 sts=4 :
@@ -66,27 +66,67 @@ fun! vm#region#new(cursor, ...) abort
     if empty(s:R()) || s:R()[s:v.index-1].A < R.A
         call add(s:R(), R)
     else
-        let i = 0
-        for r in s:R()
-            if r.A > R.A
-                call insert(s:R(), R, i)
-                break
-            endif
-            let i += 1
-        endfor
-        let s:v.index = i
-        call s:G.update_indices(i)
+        let i = s:G.bisect('A', R.A)
+        "not inserted if at the same offset of the last region
+        if i < len(s:R())
+            call insert(s:R(), R, i)
+            let s:v.index = i
+            call s:G.update_indices(i)
+        endif
     endif
 
     call s:G.update_cursor_highlight()
     return R
 endfun
 
+fun! vm#region#new_list(list) abort
+    " Create regions from a list of [l, L, a, b, txt], sorted by offset.
+    " Regions get the given text, and are merged in the regions list in a
+    " single pass. Return the list of the new regions.
+
+    if !g:Vm.buffer | call vm#init_buffer(0) | endif
+    if !s:v.eco | call s:G.set_viewport(len(s:R()) + len(a:list)) | endif
+
+    let new = []
+    for [l, L, a, b, txt] in a:list
+        call add(new, s:Region.new(0, l, L, a, b, txt))
+        let s:v.ID += 1
+    endfor
+    if empty(new) | return new | endif
+
+    "keep regions list ordered
+    let old = s:R()
+    if empty(old) || old[-1].A < new[0].A
+        call extend(old, new)
+    else
+        let [merged, i, n] = [[], 0, len(old)]
+        for R in new
+            while i < n && old[i].A <= R.A
+                call add(merged, old[i])
+                let i += 1
+            endwhile
+            call add(merged, R)
+        endfor
+        let s:V.Regions = extend(merged, old[i:])
+    endif
+
+    call s:G.update_indices()
+    let s:v.index = new[-1].index
+    call s:G.update_cursor_highlight()
+    return new
+endfun
+
 """"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 
 let s:Region = {}
 
 
+fun! vm#region#class() abort
+    " The Region class, new regions are copies of it.
+    return s:Region
+endfun
+
+
 fun! s:Region.new(cursor, ...) abort
     " Initialize region variables and methods.
     "
@@ -100,6 +140,8 @@ fun! s:Region.new(cursor, ...) abort
     " R.id         : an individual incremental id, that will never change.
     " R.dir        : is the current orientation for the region.
     " R.txt        : is the text content.
+    " R.dirty      : the text may have changed, set by the commands that edit it.
+    " R.stamp      : positions and search when the text was last read.
     " R.pat        : is the search pattern associated with the region
     " R.matches    : holds the highlighting matches
 
@@ -108,18 +150,23 @@ fun! s:Region.new(cursor, ...) abort
     let R.dir     = s:v.direction
     let R.id      = s:v.ID + 1
 
-    let R.matches = {'region': [], 'cursor': 0}
+    let R.matches = {'region': [], 'cursor': 0, 'marks': []}
 
     if !a:0                "/////// FROM MAPPINGS ///////
 
         call s:region_vars(R, a:cursor)
 
-    else                   "///////// FROM ARGS ///////////
+    elseif a:0 == 4        "///////// FROM ARGS ///////////
 
         call s:region_vars(R, a:cursor, a:1, a:2, a:3, a:4)
+
+    else                   "///////// WITH TEXT ///////////
+
+        call s:region_vars(R, a:cursor, a:1, a:2, a:3, a:4, a:5)
     endif
 
     call add(s:v.IDs_list, R.id)
+    let s:V.Index = {}
 
     if !s:v.eco
         call R.highlight()
@@ -186,6 +233,7 @@ fun! s:Region.shift(x, y) abort
     let r.L = byte2line(r.B)
     let r.a = r.A - line2byte(r.l) + 1
     let r.b = r.B - line2byte(r.L) + 1
+    let s:V.Index = {}
 
     if !s:v.eco | call r.update() | endif
     return [r.l, r.L, r.a, r.b]
@@ -203,8 +251,9 @@ fun! s:Region.remove() abort
     call self.remove_highlight()
     call remove(s:R(), self.index)
     call remove(s:v.IDs_list, index(s:v.IDs_list, self.id))
+    let s:V.Index = {}
 
-    if len(s:R()) | call s:G.update_indices()
+    if len(s:R()) | call s:G.update_indices(self.index)
     else          | let s:v.index = -1
     endif
 
@@ -223,16 +272,7 @@ endfun
 fun! s:Region.remove_from_byte_map(all) abort
     " Remove a region from the bytes map.
     if !s:X() | return | endif
-
-    if a:all
-        for b in range(self.A, self.B) | call remove(s:V.Bytes, b) | endfor
-    else
-        for b in range(self.A, self.B)
-            if s:V.Bytes[b] > 1 | let s:V.Bytes[b] -= 1
-            else                | call remove(s:V.Bytes, b)
-            endif
-        endfor
-    endif
+    call s:G.map_remove(s:V.Bytes, self.A, self.B, a:all)
 endfun
 
 
@@ -276,7 +316,7 @@ endfun
 
 
 fun! s:vertical() abort
-    return index(['j', 'k'], s:motion[0]) >=0
+    return s:motion =~# '^\d*[jk]$'
 endfun
 
 
@@ -415,6 +455,48 @@ fun! s:Region.update_cursor(...) abort
 endfun
 
 
+fun! vm#region#set_dirty(regions) abort
+    " Mark regions whose text may have been changed, so that their content
+    " is read again at their next update.
+    for r in a:regions | let r.dirty = 1 | endfor
+endfun
+
+
+fun! vm#region#update_cursors(regions, ...) abort
+    " Update cursors as Region.update_cursor() would, optionally moving them to
+    " the [line, col] positions in the list a:1. Line offsets and the search
+    " pattern are found once for all cursors.
+    if s:X() || empty(a:regions) | return | endif
+
+    let [lines, ml] = [{}, s:v.multiline]
+    let pat = s:pattern({'txt': '', 'pat': v:null})
+
+    for i in range(len(a:regions))
+        let r = a:regions[i]
+        if a:0
+            let [r.l, r.a] = a:1[i]
+        endif
+        if !has_key(lines, r.l)
+            let lines[r.l] = [line2byte(r.l), col([r.l, '$']) - 1]
+        endif
+        let [offset, eol] = lines[r.l]
+
+        " same as s:fix_pos()
+        if r.a > eol + ml | let r.a = eol ? eol + ml : 1 | endif
+
+        let r.L   = r.l              | let r.b = r.a
+        let r.A   = offset + r.a - 1 | let r.B = r.A
+        let r.k   = r.a              | let r.K = r.A
+        let r.w   = 0                | let r.h = 0
+        let r.txt = ''               | let r.dirty = 1
+        if pat isnot v:null | let r.pat = pat | endif
+    endfor
+
+    let s:v.index = a:regions[-1].index
+    let s:V.Index = {}
+endfun
+
+
 fun! s:Region.update_cursor_pos() abort
     " Update cursor to current position.
     let [ self.l, self.a ] = getpos('.')[1:2]
@@ -425,21 +507,20 @@ endfun
 
 fun! s:Region.update_content() abort
     " Get region content if in extend mode.
+    " Nothing is done if the region is clean and hasn't moved.
     let r = self
-    call cursor(r.l, r.a)   | keepjumps normal! m[
-    call cursor(r.L, r.b+1) | call vm#highlightedyank#execute_silent('silent keepjumps normal! m]`[y`]')
-    let r.txt = getreg(s:v.def_reg)
+    let stamp = [r.l, r.a, r.L, r.b, s:v.multiline, s:v.search]
+    if !get(r, 'dirty', 1) && r.stamp == stamp | return | endif
 
-    if s:v.multiline && r.b == col([r.L, '$'])
-        let r.txt .= "\n"
-    else
-        " if last character is multibyte, it won't be yanked, add it manually
-        let lastchar = s:F.char_at_pos(r.L, r.b)
-        if strlen(lastchar) > 1
-            let r.txt .= lastchar
-        endif
-    endif
+    let r.txt = s:region_text(r)
     let r.pat = s:pattern(r)
+    let r.stamp = [r.l, r.a, r.L, r.b, s:v.multiline, copy(s:v.search)]
+    let r.dirty = 0
+
+    " set the marks as a yank of the region would, the select operator uses
+    " them when its own yank fails
+    call setpos("'[", [0, r.l, r.a, 0])
+    call setpos("']", [0, r.L, min([r.b + 1, col([r.L, '$'])]), 0])
 endfun
 
 
@@ -462,6 +543,7 @@ fun! s:Region.update_vars() abort
 
     let r         = self
     let s:v.index = r.index
+    let s:V.Index = {}
 
     "   "--------- cursor mode ----------------------------
 
@@ -471,6 +553,7 @@ fun! s:Region.update_vars() abort
         let r.k   = r.a              | let r.K = r.A
         let r.w   = 0                | let r.h = 0
         let r.txt = ''               | let r.pat = s:pattern(r)
+        let r.dirty = 1
 
         "--------- extend mode ----------------------------
 
@@ -493,9 +576,11 @@ endfun
 fun! s:Region.highlight() abort
     " Create the highlight entries.
 
-    if s:v.eco | return | endif
+    if s:v.eco || !s:G.in_viewport(self) | return | endif
     let R = self
 
+    if g:VM_highlight_marks | return s:mark_region(R) | endif
+
     "------------------ cursor mode ----------------------------
 
     if !s:X()
@@ -538,6 +623,26 @@ fun! s:Region.remove_highlight() abort
 
     for m in r | silent! call matchdelete(m) | endfor
     silent! call matchdelete(c)
+    let self.matches.region = []
+
+    for mark in get(self.matches, 'marks', [])
+        call s:remove_mark(mark)
+    endfor
+    let self.matches.marks = []
+endfun
+
+
+fun! vm#region#clear_marks() abort
+    " Remove all regions' extmarks or text properties in the buffer.
+    if has('nvim')
+        call nvim_buf_clear_namespace(0, s:ns, 0, -1)
+    else
+        for type in ['vm_extend', 'vm_cursor']
+            if !empty(prop_type_get(type))
+                call prop_remove({'type': type, 'all': 1})
+            endif
+        endfor
+    endif
 endfun
 
 
@@ -551,10 +656,174 @@ endfun
 fun! s:Region.update_bytes_map() abort
     " Update bytes map for region.
     if !s:X() | return | endif
+    call s:G.map_add(s:V.Bytes, self.A, self.B)
+endfun
 
-    for b in range(self.A, self.B)
-        let s:V.Bytes[b] = get(s:V.Bytes, b, 0) + 1
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Extmarks and text properties
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+" With g:VM_highlight_marks, regions are highlighted with extmarks in neovim,
+" or with text properties in vim. They belong to the buffer, follow the text
+" when it changes, and can be all removed with a single call.
+" Marks are stored in R.matches.marks as [id, first line, last line].
+
+let s:ns = has('nvim') ? nvim_create_namespace('vm_regions') : 0
+let s:prop_id = 0
+
+" With g:VM_anchor_regions, regions are also anchored to the text while
+" commands are run at cursors, see Global.track_regions().
+
+let s:anchors_ns = has('nvim') ? nvim_create_namespace('vm_anchors') : 0
+let s:anchor_line = 1
+
+fun! s:mark_region(R) abort
+    " Create the highlight marks for a region.
+    let R = a:R
+
+    if s:X()
+        let e = s:end_col(R.L, R.b)
+        call add(R.matches.marks, s:add_mark('vm_extend', R.l, R.a, R.L, e))
+    endif
+
+    let [ln, col] = [R.cur_ln(), R.cur_col()]
+    let e = s:end_col(ln, col)
+    if e > col
+        call add(R.matches.marks, s:add_mark('vm_cursor', ln, col, ln, e))
+    elseif has('nvim')
+        "empty line or end of line, show a cursor anyway
+        let col = min([col, col([ln, '$'])])
+        call add(R.matches.marks, [nvim_buf_set_extmark(0, s:ns, ln - 1, col - 1, {
+                    \ 'virt_text': [[' ', 'MultiCursor']],
+                    \ 'virt_text_pos': 'overlay', 'priority': 1001}), ln, ln])
+    else
+        let R.matches.cursor = matchadd('MultiCursor', '\%'.ln.'l\%'.col.'c', 1001)
+    endif
+endfun
+
+
+fun! s:end_col(ln, col) abort
+    " Column after the character at position, same column if there is none.
+    let line = getline(a:ln)
+    let col = min([a:col, len(line) + 1])
+    return col + strlen(matchstr(strpart(line, col - 1), '^.'))
+endfun
+
+
+fun! s:add_mark(type, l, a, L, e) abort
+    " Add a mark from position [l, a] to [L, e], with e exclusive.
+    if has('nvim')
+        let id = nvim_buf_set_extmark(0, s:ns, a:l - 1, a:a - 1, {
+                    \ 'end_row': a:L - 1, 'end_col': a:e - 1,
+                    \ 'hl_group': a:type ==# 'vm_extend' ? 'VM_Extend' : 'MultiCursor',
+                    \ 'priority': a:type ==# 'vm_extend' ? 1000 : 1001})
+    else
+        if empty(prop_type_get(a:type))
+            call prop_type_add(a:type, {
+                        \ 'highlight': a:type ==# 'vm_extend' ? 'VM_Extend' : 'MultiCursor',
+                        \ 'priority': a:type ==# 'vm_extend' ? 1000 : 1001,
+                        \ 'combine': 0})
+        endif
+        let s:prop_id += 1
+        let id = s:prop_id
+        call prop_add(a:l, a:a, {'type': a:type, 'id': id,
+                    \            'end_lnum': a:L, 'end_col': a:e})
+    endif
+    return [id, a:l, a:L]
+endfun
+
+
+fun! s:Region.anchor() abort
+    " Anchor region start, and end if different, to the text with marks.
+    let self.anchors = [s:add_anchor(self.l, self.a)]
+    if self.B != self.A
+        call add(self.anchors, s:add_anchor(self.L, self.b))
+    endif
+endfun
+
+
+fun! s:Region.from_anchor() abort
+    " Move the region where its anchors are now. Return 0 if anchors have
+    " been deleted with the text.
+    let pos = map(copy(get(self, 'anchors', [])), 's:anchor_pos(v:val)')
+    if empty(pos) || index(pos, []) >= 0 | return 0 | endif
+
+    let [self.l, self.a] = pos[0]
+    let [self.L, self.b] = pos[-1]
+    if len(pos) > 1
+        " the end anchor is in the last character, b is its last byte
+        let e = matchend(getline(self.L),
+                    \    '\%<' . (self.b + 1) . 'c.\%>' . self.b . 'c')
+        let self.b = max([e, self.b])
+    endif
+    let self.A = line2byte(self.l) + self.a - 1
+    let self.B = line2byte(self.L) + self.b - 1
+    let s:V.Index = {}
+
+    if !s:v.eco | call self.update() | endif
+    return 1
+endfun
+
+
+fun! vm#region#clear_anchors() abort
+    " Remove all regions' anchors.
+    let s:anchor_line = 1
+    if has('nvim')
+        call nvim_buf_clear_namespace(0, s:anchors_ns, 0, -1)
+    elseif !empty(prop_type_get('vm_anchor'))
+        call prop_remove({'type': 'vm_anchor', 'all': 1})
+    endif
+endfun
+
+
+fun! s:add_anchor(l, a) abort
+    " Add a zero-width anchor at position, return its id.
+    let col = min([a:a, len(getline(a:l)) + 1])
+    if has('nvim')
+        return nvim_buf_set_extmark(0, s:anchors_ns, a:l - 1, col - 1, {})
+    endif
+    if empty(prop_type_get('vm_anchor'))
+        call prop_type_add('vm_anchor', {})
+    endif
+    let s:prop_id += 1
+    call prop_add(a:l, col, {'type': 'vm_anchor', 'id': s:prop_id, 'length': 0})
+    return s:prop_id
+endfun
+
+
+fun! s:anchor_pos(id) abort
+    " Current position of an anchor, or [] if it has been deleted.
+    " Regions are processed in order, so the search for text properties
+    " starts from the line of the last anchor that has been found.
+    if has('nvim')
+        let pos = nvim_buf_get_extmark_by_id(0, s:anchors_ns, a:id, {})
+        return empty(pos) ? [] : [pos[0] + 1, pos[1] + 1]
+    endif
+
+    let lnum = min([s:anchor_line, line('$')])
+    for dir in ['f', 'b']
+        let p = prop_find({'type': 'vm_anchor', 'id': a:id, 'both': 1,
+                    \      'lnum': lnum, 'col': 1}, dir)
+        if !empty(p)
+            let s:anchor_line = p.lnum
+            return [p.lnum, p.col]
+        endif
     endfor
+    return []
+endfun
+
+
+fun! s:remove_mark(mark) abort
+    " Remove a mark. Text properties are searched in the lines where they were
+    " added first, then in the whole buffer if they have been moved.
+    let [id, l, L] = a:mark
+    if has('nvim')
+        call nvim_buf_del_extmark(0, s:ns, id)
+    elseif L > line('$') || !prop_remove({'id': id, 'all': 1}, l, L)
+        call prop_remove({'id': id, 'all': 1})
+    endif
 endfun
 
 
@@ -583,6 +852,19 @@ fun! s:pattern(r) abort
 endfun
 
 
+fun! s:region_text(r) abort
+    " Text between the region boundaries, the last character is included.
+    let r = a:r
+    let lines = getline(r.l, r.L)
+    " the end column can be any byte of the last character
+    let end = matchend(lines[-1], '\%<' . (r.b + 1) . 'c.\%>' . r.b . 'c')
+    let lines[-1] = strpart(lines[-1], 0, end < 0 ? r.b - 1 : end)
+    let lines[0] = strpart(lines[0], r.a - 1)
+    let txt = join(lines, "\n")
+    return s:v.multiline && r.b == col([r.L, '$']) ? txt . "\n" : txt
+endfun
+
+
 fun! s:fix_pos(r) abort
     " Fix positions at end of line.
     let r = a:r
@@ -649,7 +931,12 @@ fun! s:region_vars(r, cursor, ...) abort
         let R.b     = a:4
 
         call s:fix_pos(R)
-        call R.update_content()
+        if a:0 == 5
+            let R.txt = a:5                 " text content, if known
+            let R.pat = s:pattern(R)        " associated search pattern
+        else
+            call R.update_content()
+        endif
 
         let R.A     = R.A_()                " byte offset a
         let R.B     = R.B_()                " byte offset b
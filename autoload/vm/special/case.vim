@@ -121,10 +121,10 @@ fun! s:Case.convert(type) abort
     call vm#operators#select(1, 'iw')
   endif
 
-  let text = [] | let g:Vm.registers['"'] = text
+  let text = []
   for r in s:R()
     call add(text, eval("self.".a:type."(r.txt)"))
   endfor
-  call b:VM_Selection.Edit.paste(1, 0, 1, '"')
+  call b:VM_Selection.Edit.replace_regions_with_text(text)
 endfun
 " vim: et ts=2 sw=2 sts=2 :
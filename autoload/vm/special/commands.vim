@@ -202,9 +202,8 @@ fun! vm#special#commands#mass_transpose()
     call add(new_text, old[index(unique, t)])
   endfor
 
-  " fill register and paste new text
-  call VM.Edit.fill_register('"', new_text, 0)
-  call VM.Edit.paste(1, 0, 1, '"')
+  " replace regions with the new text
+  call VM.Edit.replace_regions_with_text(new_text)
 endfun "}}}
 
 
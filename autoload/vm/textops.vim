@@ -0,0 +1,468 @@
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Text operations
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Some simple commands (x, X, ~, r<char>, dw, deleting selections, pasting
+" text without line breaks) can be applied without running a normal command at
+" each region: the new content of the lines is computed from the regions
+" offsets, and each changed line is set once. Regions end up where the normal
+" command would have left them.
+"
+" Functions return 0 when a command can't be handled this way, and nothing has
+" been changed: the caller will then run its normal command loop.
+
+fun! vm#textops#init() abort
+    let s:V = b:VM_Selection
+    let s:v = s:V.Vars
+    let s:G = s:V.Global
+    let s:F = s:V.Funcs
+endfun
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Lambdas
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+let s:R = { -> s:V.Regions }
+let s:X = { -> g:Vm.extend_mode }
+
+" the character at a byte column, empty if the column is not at a character
+let s:char = { text, col -> matchstr(text, '\%' . col . 'c.') }
+
+let s:lower = 'abcdefghijklmnopqrstuvwxyz'
+let s:upper = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Commands at cursors
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! vm#textops#normal(cmd, stay_put, txt) abort
+    " Run a normal command at cursors, if it's one of the supported ones.
+    " Deleted text is added to the list a:txt.
+    if !g:VM_text_engine || s:X() || !&modifiable | return 0 | endif
+
+    let cmd = matchlist(a:cmd, '\v^%(silent! )?normal(!)? (\d*)(.+)$')
+    if empty(cmd) | return 0 | endif
+    let [recursive, n, key] = [cmd[1] == '', max([str2nr(cmd[2]), 1]), cmd[3]]
+
+    if key ==? 'x' || key ==# 'dw'
+        " deleted text must go to the - register only
+        if !empty(&clipboard) | return 0 | endif
+        let keys = key ==# 'dw' ? [['d', 'n'], ['w', 'o']] : [[key, 'n']]
+        let Op = function(key ==# 'x' ? 's:x' : key ==# 'X' ? 's:x_before' : 's:dw', [n])
+
+    elseif key ==# '~'
+        if &tildeop || &whichwrap =~ '\~' | return 0 | endif
+        let keys = [['~', 'n']]
+        let Op = function('s:tilde', [n])
+
+    elseif key =~# '^r.$' && key[1:] =~ '^\p$'
+        let keys = [['r', 'n']]
+        let Op = function('s:replace', [n, key[1:]])
+
+    else
+        return 0
+    endif
+
+    " user mappings would change the meaning of the command
+    if recursive
+        for [lhs, mode] in keys
+            if !empty(mapcheck(lhs, mode)) | return 0 | endif
+        endfor
+    endif
+
+    let [changes, lines, first] = s:changes(Op)
+    if empty(changes) | return 0 | endif
+
+    let deleted = []
+    for [r, a, col, text] in changes
+        let [r.a, r.b] = a:stay_put ? [a, a] : [col, col]
+        if !empty(text) | call add(deleted, text) | endif
+    endfor
+    call s:set_lines(lines, first, [r.l, r.a])
+
+    if key !=# '~' && key[0] !=# 'r'
+        if !empty(deleted) | call setreg('-', deleted[-1]) | endif
+        call extend(a:txt, deleted)
+    endif
+    return 1
+endfun
+
+
+fun! s:changes(Op) abort
+    " Compute the new lines and the new cursors positions.
+    " Return the changes, the changed lines and the position of the first
+    " change. Changes are [region, column, new column, deleted text], where
+    " column is the one the region would have before running the command.
+    let changes = [] | let lines = [] | let [ln, text, first] = [0, '', []]
+
+    for r in s:R()
+        if r.l != ln
+            if r.l < ln | return [[], [], []] | endif
+            call s:add_line(lines, ln, text)
+            let [ln, text, shift, last] = [r.l, s:getline(r.l), 0, 1]
+        endif
+
+        if r.a < last | return [[], [], []] | endif
+
+        " a:Op returns [start, end, replacement, new column]
+        let op = a:Op(text, r.a + shift)
+        if empty(op) || op[0] - shift < last | return [[], [], []] | endif
+
+        let [start, end, new, col] = op
+        if empty(first) && end > start
+            let first = [ln, start]
+        endif
+        call add(changes, [r, r.a + shift, col, strpart(text, start - 1, end - start)])
+        let text = strpart(text, 0, start - 1) . new . strpart(text, end - 1)
+        let last = end - shift
+        let shift += len(new) - (end - start)
+    endfor
+
+    call s:add_line(lines, ln, text)
+    return [changes, lines, first]
+endfun
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! s:x(n, text, a) abort
+    " x: delete up to n characters from the cursor. If there are less than
+    " that and 'whichwrap' has 'l', the normal command could join lines.
+    if a:a == len(a:text) + 1 && a:text != '' | return [a:a, a:a, '', a:a] | endif
+    let seg = matchstr(a:text, '\%' . a:a . 'c.\{1,' . a:n . '}')
+    if empty(seg) || strchars(seg) < a:n && &whichwrap =~ 'l' | return [] | endif
+    return [a:a, a:a + len(seg), '', a:a]
+endfun
+
+
+fun! s:x_before(n, text, a) abort
+    " X: delete up to n characters before the cursor. If there are less than
+    " that and 'whichwrap' has 'h', the normal command could join lines.
+    if a:a != len(a:text) + 1 && empty(s:char(a:text, a:a)) | return [] | endif
+    let seg = matchstr(a:text, '.\{,' . a:n . '}\%' . a:a . 'c')
+    if strchars(seg) < a:n && &whichwrap =~ 'h' | return [] | endif
+    return [a:a - len(seg), a:a, '', a:a - len(seg)]
+endfun
+
+
+fun! s:tilde(n, text, a) abort
+    " ~: toggle case of n characters, the cursor moves after them.
+    let seg = matchstr(a:text, '\%' . a:a . 'c.\{1,' . a:n . '}')
+    if empty(seg) || seg =~ '[^\x01-\x7f]' | return [] | endif
+    let new = tr(seg, s:lower . s:upper, s:upper . s:lower)
+    return [a:a, a:a + len(seg), new, a:a + len(seg)]
+endfun
+
+
+fun! s:replace(n, char, text, a) abort
+    " r: replace exactly n characters, the cursor is on the last one.
+    let seg = matchstr(a:text, '\%' . a:a . 'c.\{' . a:n . '}')
+    if empty(seg) | return [] | endif
+    return [a:a, a:a + len(seg), repeat(a:char, a:n), a:a + (a:n - 1) * len(a:char)]
+endfun
+
+
+fun! s:dw(n, text, a) abort
+    " dw: only if the next word starts in the same line, since the motion
+    " has special cases when crossing lines.
+    let end = a:a - 1
+    for i in range(a:n)
+        let rest = strpart(a:text, end)
+        if rest =~ '^\s'     | let end += matchend(rest, '^\s\+')
+        elseif rest =~ '^\k' | let end += matchend(rest, '^\k\+\s*')
+        elseif rest != ''    | let end += matchend(rest, '^\%(\k\@!\S\)\+\s*')
+        endif
+    endfor
+    " word classes are only the same as \k for ASCII characters
+    if end >= len(a:text) || strpart(a:text, a:a - 1, end - a:a + 2) =~ '[^\x01-\x7f]'
+        return []
+    endif
+    return [a:a, end + 1, '', a:a]
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Delete selections
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! vm#textops#delete() abort
+    " Delete the text of regions, as done by Edit.delete(). Extra spaces are
+    " added at EOL in the same way, so that they can be removed later.
+    if !g:VM_text_engine || !&modifiable | return 0 | endif
+
+    let changes = [] | let lines = [] | let spaces = [] | let [ln, text] = [0, '']
+
+    for r in s:R()
+        if r.l != r.L || r.l < ln | return 0 | endif
+        if r.l != ln
+            call s:add_line(lines, ln, text)
+            let [ln, text, shift, last] = [r.l, s:getline(r.l), 0, 1]
+        endif
+        if r.a < last | return 0 | endif
+
+        " regions that follow are shifted by the added space, even if they
+        " are before it, because regions are tracked by the buffer size
+        let [a, b] = [r.a + shift, r.b + shift]
+        if b >= strwidth(text)
+            let text .= ' '
+            let shift += 1
+            call add(spaces, r.index)
+        endif
+
+        let char = s:char(text, a)
+        let end = r.w == 1 ? a + len(char) : b + 1
+        if empty(char) || end > len(text) + 1 ||
+                    \ end <= len(text) && empty(s:char(text, end))
+            return 0
+        endif
+
+        call add(changes, [r, a, b])
+        let text = strpart(text, 0, a - 1) . strpart(text, end - 1)
+        let last = r.b + 1
+        let shift -= end - a
+    endfor
+
+    if empty(changes) | return 0 | endif
+    call s:add_line(lines, ln, text)
+
+    for [r, a, b] in changes
+        let [r.a, r.b, r.dirty] = [a, b, 1]
+    endfor
+    call s:set_lines(lines, [changes[0][0].l, changes[0][1]], [r.l, r.a])
+    call extend(s:v.extra_spaces, spaces)
+    return 1
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Paste at cursors
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! vm#textops#paste(text, before) abort
+    " Paste the strings of the list a:text at cursors, as done by P or p in
+    " Edit.block_paste(). Strings with line breaks aren't supported.
+    if !g:VM_text_engine || s:X() || !&modifiable | return 0 | endif
+
+    let change = s:paste(a:text, a:before)
+    if empty(change) | return 0 | endif
+    call s:apply(change)
+    return 1
+endfun
+
+
+fun! s:paste(text, before) abort
+    " Compute the lines with the text pasted at cursors.
+    let changes = [] | let lines = [] | let [ln, text, first] = [0, '', []]
+    let stay = a:before || exists('s:v.dont_move_cursors')
+
+    for [r, s] in s:zip(s:R(), a:text)
+        if r.l != r.L || r.l < ln || empty(s) || s =~ "\n" | return [] | endif
+        if r.l != ln
+            call s:add_line(lines, ln, text)
+            let [ln, text, shift, last] = [r.l, s:getline(r.l), 0, 1]
+        endif
+        if r.a < last | return [] | endif
+
+        let a = r.a + shift
+        let char = s:char(text, a)
+        if empty(char) && a != len(text) + 1 | return [] | endif
+
+        " p pastes after the character under the cursor, and moves the
+        " cursor to the last pasted character
+        let pos = a:before ? a : a + len(char)
+        let end = pos + len(s) - len(matchstr(s, '.$'))
+
+        if empty(first) | let first = [r.l, a] | endif
+        let col = stay ? a : end
+        call add(changes, [r, col, col])
+        let text = strpart(text, 0, pos - 1) . s . strpart(text, pos - 1)
+        let last = r.a + 1
+        let shift += len(s)
+    endfor
+
+    if empty(changes) | return [] | endif
+    call s:add_line(lines, ln, text)
+    return [changes, lines, first, [r.l, end]]
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Replace regions
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! vm#textops#replace(text, before) abort
+    " Replace the regions with the strings of the list a:text, with the same
+    " result of pasting them, but without using registers. In extend mode,
+    " regions are left at the start of the new text, to be reselected.
+    " Regions are backed up for undo, if the text can be replaced.
+    if !g:VM_text_engine || !&modifiable || len(a:text) != len(s:R())
+        return 0
+    endif
+
+    if !s:X()
+        let change = s:paste(a:text, a:before)
+    else
+        let change = a:before ? s:replace_text(a:text) : []
+    endif
+    if empty(change) | return 0 | endif
+
+    call s:G.backup_regions()
+    call s:apply(change)
+    return 1
+endfun
+
+
+fun! s:replace_text(text) abort
+    " Compute the lines with the text of the selections replaced.
+    let changes = [] | let lines = [] | let [ln, text] = [0, '']
+
+    for [r, s] in s:zip(s:R(), a:text)
+        if r.l != r.L || r.l < ln || empty(s) || s =~ "\n" | return [] | endif
+        if r.l != ln
+            call s:add_line(lines, ln, text)
+            let [ln, text, shift, last] = [r.l, s:getline(r.l), 0, 1]
+        endif
+        if r.a < last | return [] | endif
+
+        let [a, b] = [r.a + shift, r.b + shift]
+        let char = s:char(text, a)
+        let end = r.w == 1 ? a + len(char) : b + 1
+        if empty(char) || end > len(text) + 1 ||
+                    \ end <= len(text) && empty(s:char(text, end))
+            return []
+        endif
+
+        if empty(changes) | let first = [r.l, a] | endif
+        call add(changes, [r, a, a])
+        let text = strpart(text, 0, a - 1) . s . strpart(text, end - 1)
+        let last = r.b + 1
+        let shift += len(s) - (end - a)
+    endfor
+
+    if empty(changes) | return [] | endif
+    call s:add_line(lines, ln, text)
+    return [changes, lines, first, [r.l, a + len(s) - len(matchstr(s, '.$'))]]
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Transactions
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Changed lines are collected in a transaction, and written when it's
+" committed: lines that are edited more than once (deleting selections, then
+" pasting text in their place) are then set only once, with a single setline()
+" for each block of consecutive lines, in a single undo step.
+"
+" The number of lines never changes, so regions keep their lines and columns
+" while a transaction is open, and their offsets are updated on commit.
+" A command that is applied alone is committed immediately.
+
+let s:T = {}
+
+fun! vm#textops#begin() abort
+    " Start a transaction.
+    let s:T = {'lines': {}, 'pos': [], 'cursor': []}
+endfun
+
+
+fun! vm#textops#commit() abort
+    " Write the lines changed in the transaction, and update the regions.
+    if empty(s:T) | return | endif
+    let [T, s:T] = [s:T, {}]
+    if empty(T.cursor) | return | endif
+
+    " the cursor is moved where the first change happens, so that it will be
+    " restored there by undo, as it would happen with normal commands
+    if !empty(T.pos) | call cursor(T.pos) | endif
+
+    let lnums = sort(map(keys(T.lines), 'str2nr(v:val)'), 'n')
+    let i = 0
+    while i < len(lnums)
+        let ln = lnums[i]
+        let block = [T.lines[ln]]
+        let i += 1
+        while i < len(lnums) && lnums[i] == ln + len(block)
+            call add(block, T.lines[lnums[i]])
+            let i += 1
+        endwhile
+        call setline(ln, block)
+    endwhile
+
+    call cursor(T.cursor)
+    call s:update_regions()
+endfun
+
+
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+" Helpers
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+fun! s:getline(ln) abort
+    " The line as changed by the open transaction.
+    return empty(s:T) ? getline(a:ln) : get(s:T.lines, a:ln, getline(a:ln))
+endfun
+
+
+fun! s:add_line(lines, ln, text) abort
+    " Add a line to the lines to set, if it has changed.
+    if a:ln && a:text !=# s:getline(a:ln)
+        call add(a:lines, [a:ln, a:text])
+    endif
+endfun
+
+
+fun! s:set_lines(lines, pos, cursor) abort
+    " Add the changed lines to the open transaction, or write them now.
+    " a:pos is where the first change happens, a:cursor is where the cursor
+    " would be left by the last command.
+    let alone = empty(s:T)
+    if alone | call vm#textops#begin() | endif
+
+    if empty(s:T.pos) | let s:T.pos = a:pos | endif
+    let s:T.cursor = a:cursor
+    for [ln, text] in a:lines
+        let s:T.lines[ln] = text
+    endfor
+
+    if alone | call vm#textops#commit() | endif
+endfun
+
+
+fun! s:apply(change) abort
+    " Set the new regions columns, and the changed lines.
+    " a:change is [changes, lines, first change, cursor], with changes in the
+    " form [region, new a, new b].
+    let [changes, lines, pos, cursor] = a:change
+    for [r, a, b] in changes
+        let [r.a, r.b, r.dirty] = [a, b, 1]
+    endfor
+    call s:set_lines(lines, pos, cursor)
+endfun
+
+
+fun! s:update_regions() abort
+    " Update the offsets of the regions, whose lines and columns are set.
+    let ln = 0
+    for r in s:R()
+        if r.l != ln
+            let [ln, offset] = [r.l, line2byte(r.l) - 1]
+        endif
+        let r.A = offset + r.a
+        let r.B = r.L == r.l ? offset + r.b : line2byte(r.L) - 1 + r.b
+    endfor
+    let s:V.Index = {}
+endfun
+
+
+fun! s:zip(regions, text) abort
+    " Pair regions with the strings of a list, that can be shorter.
+    let n = min([len(a:regions), len(a:text)])
+    return n ? map(a:regions[: n - 1], '[v:val, a:text[v:key]]') : []
+endfun
+
+" vim: et sw=4 ts=4 sts=4 fdm=indent fdn=1
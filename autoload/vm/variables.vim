@@ -99,6 +99,9 @@ fun! vm#variables#init() abort
   let v.use_register     = v.def_reg
   let v.deleting         = 0
   let v.vmarks           = [getpos("'<"), getpos("'>")]
+  let v.hl_lines         = []
+  let v.anchored         = 0
+  let v.track_size       = 0
 endfun
 
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
@@ -54,7 +54,8 @@ endfun
 fun! vm#visual#reduce() abort
     " Remove regions outside of visual selection.
     let X = s:backup_map()
-    call s:G.rebuild_from_map(s:Bytes, [s:F.pos2byte("'<"), s:F.pos2byte("'>")])
+    call s:G.rebuild_from_map(s:G.map_from_ranges(values(s:Bytes)),
+                \             [s:F.pos2byte("'<"), s:F.pos2byte("'>")])
     if X | call s:G.cursor_mode() | endif
     call s:G.update_and_select_region()
 endfun
@@ -320,21 +321,21 @@ fun! s:create_cursors(start, end, mode, ...) abort
     "a:1 (optional): original cursor position [line, column]
 
     if a:mode ==# 'V'
-        " Line-wise: start at first non-blank of each line (cursor mode)
-        call cursor(a:start[0], 1)
-        normal! ^
-        call s:G.new_cursor()
-
-        " Add cursors for remaining lines, each at first non-blank
-        if a:end[0] > a:start[0]
-            for line_num in range(a:start[0] + 1, a:end[0])
-                call cursor(line_num, 1)
-                normal! ^
-                if s:F.char_under_cursor() =~ '\v\S'
-                    call s:G.new_cursor()
-                endif
-            endfor
-        endif
+        " Line-wise: a cursor at the first non-blank of each line, the first
+        " line always gets one (at its end if blank, like ^)
+        let positions = []
+        for line_num in range(a:start[0], a:end[0])
+            let line = getline(line_num)
+            let col = match(line, '\S') + 1
+            if !col && line_num == a:start[0]
+                let col = match(line, '.$') + 1
+                let col = col ? col : 1
+            endif
+            if col
+                call add(positions, [line_num, col])
+            endif
+        endfor
+        call s:G.new_cursors(positions)
     elseif a:mode ==# "\<C-v>"
         " Block-wise: create regions matching the visual block
         " In visual block mode, when called from visual mode mapping,
@@ -357,27 +358,31 @@ fun! s:create_cursors(start, end, mode, ...) abort
         " Determine if cursor should be at end of regions (1) or start (0)
         let region_dir = cursor_at_right ? 1 : 0
 
-        let regions_created = []
-
+        " Regions span the same number of characters on each line, starting
+        " at the character at start_col, without going past the end of line.
+        " Only create a region if there's content in the block area.
+        let matches = []
+        let chars = end_col - start_col + 1
+        let at_col = '\%<' . (start_col + 1) . 'c.\%>' . start_col . 'c'
         for line_num in range(a:start[0], a:end[0])
-            call cursor(line_num, start_col)
-            " Only create region if there's content in the block area
-            if s:F.char_under_cursor() =~ '\v\S'
-                " Create a region for just the block area on this line
-                " Use visual selection but save/restore marks after
-                let chars_to_select = end_col - start_col
-                if chars_to_select == 0
-                    " Single column selection - select just one character
-                    call vm#highlightedyank#execute_silent('keepjumps normal! vy')
-                else
-                    " Multi-column selection
-                    call vm#highlightedyank#execute_silent('keepjumps normal! v' . chars_to_select . 'ly')
-                endif
-                call s:G.new_region()
-                let regions_created += [len(s:R()) - 1]  " Store region index
+            let line = getline(line_num)
+            let col = match(line, at_col) + 1
+            if matchstr(line, at_col) !~ '\S'
+                continue
             endif
+            let txt = matchstr(line, '.\{,' . chars . '}', col - 1)
+            " like the '] mark after a yank, end column is the last byte
+            call add(matches, [line_num, line_num, col, col + len(txt) - 1, txt])
         endfor
 
+        let direction = s:v.direction
+        let s:v.direction = region_dir
+        try
+            call s:G.new_regions(matches)
+        finally
+            let s:v.direction = direction
+        endtry
+
         " Restore the original visual marks
         call setpos("'<", saved_vstart)
         call setpos("'>", saved_vend)
@@ -390,35 +395,24 @@ fun! s:create_cursors(start, end, mode, ...) abort
         execute "normal! \<Esc>"
         call setpos('.', save_cursor)
 
-        " Position active cursor based on original cursor position
-        if len(regions_created) > 0
-            let regions = s:R()
-
-            " Set direction for ALL regions based on whether cursor was left/right
-            for idx in regions_created
-                let regions[idx].dir = region_dir
-            endfor
-
-            " Select the appropriate region based on top/bottom position
-            let target_region_idx = cursor_at_bottom ? regions_created[-1] : regions_created[0]
-
-            " Select the target region
-            call s:G.select_region(target_region_idx)
+        " Select the appropriate region based on top/bottom position
+        if len(matches) > 0
+            let target = matches[cursor_at_bottom ? -1 : 0]
+            let R = s:G.region_at_pos([target[0], target[2]])
+            if !empty(R)
+                call s:G.select_region(R.index)
+            endif
         endif
     else
-        " Character-wise: use original column positioning
+        " Character-wise: a cursor at the starting position, and below it
+        " down to the last line of the selection. The starting position gets
+        " a cursor even if it's on a blank, since add_cursor_down() always
+        " creates one where it starts.
         call cursor(a:start[0], a:start[1])
-
-        " Ensure there's at least one cursor at the starting position
-        if s:F.char_under_cursor() =~ '\v\S' || a:start[0] == a:end[0]
-            call s:G.new_cursor()
-        endif
-
-        " Add cursors for remaining lines
         if a:end[0] > a:start[0]
-            while line('.') < a:end[0]
-                call vm#commands#add_cursor_down(0, 1)
-            endwhile
+            call vm#commands#add_cursor_down(0, a:end[0] - a:start[0], a:end[0])
+        else
+            call s:G.new_cursor()
         endif
     endif
 endfun
@@ -468,7 +462,7 @@ fun! s:visual_subtract() abort
             unlet s:Bytes[r.id]
         endif
     endfor
-    call s:G.rebuild_from_map(s:Bytes)
+    call s:G.rebuild_from_map(s:G.map_from_ranges(values(s:Bytes)))
     if X | call s:G.cursor_mode() | endif
 endfun
 
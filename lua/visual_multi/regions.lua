@@ -0,0 +1,138 @@
+-- Neovim counterpart of python/vm.py.
+--
+-- Functions here receive the whole set of regions (as compact lists, not as
+-- region dictionaries) and compute the new set in a single pass. They return
+-- a list for Global.regions_from_list(), or a dictionary for
+-- Global.lines_with_regions().
+
+local M = {}
+
+--------------------------------------------------------------------------------
+
+-- Rebuild regions from bytes map.
+function M.rebuild_from_map(map, range)
+    local regions = {}
+    local A, B = range[1], range[2]
+
+    for _, seg in ipairs(map) do
+        local s, e = seg[1], seg[2]
+        if A then
+            if e < A or s > B then goto continue end
+            s, e = math.max(s, A), math.min(e, B)
+        end
+        local last = regions[#regions]
+        if last and s <= last[2] + 1 then
+            last[2] = math.max(last[2], e)
+        else
+            regions[#regions + 1] = { s, e }
+        end
+        ::continue::
+    end
+    return regions
+end
+
+--------------------------------------------------------------------------------
+
+-- Find the cursors to keep, skipping those at the same offset.
+function M.merge_cursors(offsets)
+    local keep, last = {}, nil
+    for i, A in ipairs(offsets) do
+        if A ~= last then
+            keep[#keep + 1] = i - 1
+        end
+        last = A
+    end
+    return keep
+end
+
+--------------------------------------------------------------------------------
+
+-- Sort region indices by their starting offset.
+function M.reorder_regions(offsets)
+    local order = {}
+    for i = 1, #offsets do
+        order[i] = i
+    end
+    -- table.sort is not stable, compare indices for equal offsets
+    table.sort(order, function(x, y)
+        if offsets[x] ~= offsets[y] then
+            return offsets[x] < offsets[y]
+        end
+        return x < y
+    end)
+    for i = 1, #order do
+        order[i] = order[i] - 1
+    end
+    return order
+end
+
+--------------------------------------------------------------------------------
+
+-- Find the first region of each line.
+function M.one_region_per_line(lines)
+    local keep, seen = {}, {}
+    for i, line in ipairs(lines) do
+        if not seen[line] then
+            seen[line] = true
+            keep[#keep + 1] = i - 1
+        end
+    end
+    return keep
+end
+
+--------------------------------------------------------------------------------
+
+-- Split active multiline regions, so that each is in a single line.
+function M.split_lines(positions, active)
+    local regions, is_active = {}, {}
+    for _, ix in ipairs(active) do
+        is_active[ix] = true
+    end
+
+    for i, r in ipairs(positions) do
+        local l, L, a, b = r[1], r[2], r[3], r[4]
+        if l == L or not is_active[i - 1] then
+            regions[#regions + 1] = i - 1
+        else
+            local text = vim.api.nvim_buf_get_lines(0, l - 1, L, false)
+            for n = l, L do
+                if n == l then
+                    regions[#regions + 1] = { l, l, a, #text[1] }
+                elseif n < L then
+                    regions[#regions + 1] = { n, n, 1, #text[n - l + 1] }
+                else
+                    regions[#regions + 1] = { L, L, 1, b }
+                end
+            end
+        end
+    end
+    return regions
+end
+
+--------------------------------------------------------------------------------
+
+-- Find lines with regions.
+function M.lines_with_regions(regions, reverse, specific_line)
+    -- string keys, so that the table is converted to a dictionary
+    local lines = vim.empty_dict()
+
+    for _, r in ipairs(regions) do
+        local line, index = r[1], r[2]
+        -- called for a specific line
+        if specific_line == 0 or line == specific_line then
+            local key = tostring(line)
+            lines[key] = lines[key] or {}
+            table.insert(lines[key], index)
+        end
+    end
+
+    -- sort list so that lower indices are put farther in the list
+    for _, ixs in pairs(lines) do
+        if #ixs > 1 then
+            table.sort(ixs, reverse and function(x, y) return x > y end or nil)
+        end
+    end
+    return lines
+end
+
+return M
@@ -1,5 +1,10 @@
 import vim
 
+# Functions here receive the whole set of regions (as compact lists, not as
+# region dictionaries) and compute the new set in a single pass. The result is
+# stored in a local variable of the calling function with a single command,
+# and the regions are then installed by Global.regions_from_list().
+
 #------------------------------------------------------------------------------
 
 def py_rebuild_from_map():
@@ -7,39 +12,95 @@ def py_rebuild_from_map():
 
     bmap = ev('l:dict')
     Range = ev('l:range')
-    bys = sorted([int(b) for b in bmap.keys()])
+    segs = [(int(s[0]), int(s[1])) for s in bmap]
     if Range:
         A, B = int(Range[0]), int(Range[1])
-        bys = [b for b in bys if b >= A and b <= B]
-
-    start, end = bys[0], bys[0]
-    vim.command('call b:VM_Selection.Global.erase_regions()')
+        segs = [(max(s, A), min(e, B)) for s, e in segs if e >= A and s <= B]
 
-    for i in bys[1:]:
-        if i == end + 1:
-            end = i
+    regions = []
+    for s, e in segs:
+        if regions and s <= regions[-1][1] + 1:
+            regions[-1][1] = max(regions[-1][1], e)
         else:
-            vim.command('call vm#region#new(0, %d, %d)' % (start, end))
-            start, end = i, i
+            regions.append([s, e])
+
+    let('l:regions', regions)
+
+#------------------------------------------------------------------------------
+
+def py_merge_cursors():
+    """Find the cursors to keep, skipping those at the same offset."""
+
+    keep, last = [], None
+    for i, A in enumerate(evlist('l:offsets')):
+        if A != last:
+            keep.append(i)
+        last = A
 
-    vim.command('call vm#region#new(0, %d, %d)' % (start, end))
+    let('l:regions', keep)
+
+#------------------------------------------------------------------------------
+
+def py_reorder_regions():
+    """Sort region indices by their starting offset."""
+
+    As = evlist('l:offsets')
+    let('l:regions', sorted(range(len(As)), key=lambda i: As[i]))
+
+#------------------------------------------------------------------------------
+
+def py_one_region_per_line():
+    """Find the first region of each line."""
+
+    keep, seen = [], set()
+    for i, line in enumerate(evlist('l:lines')):
+        if line not in seen:
+            seen.add(line)
+            keep.append(i)
+
+    let('l:regions', keep)
+
+#------------------------------------------------------------------------------
+
+def py_split_lines():
+    """Split active multiline regions, so that each is in a single line."""
+
+    buf = vim.current.buffer
+    enc = ev('&encoding')
+    active = set(evlist('l:active'))
+    regions = []
+
+    for i, r in enumerate(ev('l:positions')):
+        l, L, a, b = [int(n) for n in r]
+        if l == L or i not in active:
+            regions.append(i)
+            continue
+        for n in range(l, L + 1):
+            if n == l:
+                regions.append([l, l, a, _line_len(buf, n, enc)])
+            elif n < L:
+                regions.append([n, n, 1, _line_len(buf, n, enc)])
+            else:
+                regions.append([L, L, 1, b])
+
+    let('l:regions', regions)
 
 #------------------------------------------------------------------------------
 
 def py_lines_with_regions():
     """Find lines with regions."""
 
-    lines, regions = {}, ev('s:R()')
+    lines = {}
     specific_line, rev = evint('l:specific_line'), evint('a:reverse')
 
-    for r in regions:
-        line = int(r['l'])
+    for line, index in ev('l:regions'):
+        line = int(line)
         #called for a specific line
         if specific_line and line != specific_line:
             continue
         #add region index to indices for that line
         lines.setdefault(line, [])
-        lines[line].append(int(r['index']))
+        lines[line].append(int(index))
 
     for line in lines:
       #sort list so that lower indices are put farther in the list
@@ -59,6 +120,11 @@ def evint(exp):
     return int(vim.eval(exp))
 
 
+def evlist(exp):
+    """Eval a vim expression as a list of integers."""
+    return [int(n) for n in vim.eval(exp)]
+
+
 def ev(exp):
     """Eval a vim expression."""
     return vim.eval(exp)
@@ -67,3 +133,6 @@ def let(name, value):
     """Let variable through vim command."""
     vim.command('let %s = %s' % (name, str(value)))
 
+def _line_len(buf, lnum, enc):
+    """Length in bytes of a buffer line, as len(getline(lnum))."""
+    return len(buf[lnum - 1].encode(enc, 'surrogateescape'))
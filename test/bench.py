@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Headless scalability benchmarks. See README."""
+
+import argparse
+from pathlib import Path
+import datetime
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+# -------------------------------------------------------------
+# operations
+# -------------------------------------------------------------
+
+# keys are written in vim notation, as in the tests
+# SELECT selects all occurrences of the word 'hit' in extend mode
+SELECT = r'\<C-n>\\\\A'
+
+# name: (setup keys, timed keys), '{n}' is the number of regions
+# VM redo only reaches the snapshots taken before each change, so two changes
+# must be undone for redo to have something to do
+OPS = {
+    'find_all':    ('', SELECT),
+    'ctrl_n':      ('', r'\<C-n>' + '{n}'),
+    'motion_w':    (SELECT + r'\<Tab>', 'w'),
+    'motion_j':    (SELECT + r'\<Tab>', 'j'),
+    'insert':      (SELECT + r'\<Tab>', r'ifoo\<Esc>'),
+    'delete':      (SELECT, 'd'),
+    'paste':       (SELECT + 'y', 'p'),
+    'undo':        (SELECT + 'd', 'u'),
+    'redo':        (SELECT + 'dxu', r'\<C-r>'),
+    'merge':       (SELECT + r'\<Tab>', '0'),
+    'mode_change': (SELECT, r'\<Tab>'),
+}
+
+# operations that must change the buffer, or they timed nothing
+EDITS = {'insert', 'delete', 'paste', 'undo', 'redo'}
+
+
+# -------------------------------------------------------------
+# functions
+# -------------------------------------------------------------
+def vim_string(keys):
+    """Vim double-quoted string for keys in vim notation."""
+    return '"' + keys.replace('"', r'\"') + '"'
+
+
+def editor_version():
+    """First line of the editor version."""
+    out = subprocess.run([VIM, '--version'], capture_output=True, text=True)
+    return out.stdout.splitlines()[0] if out.stdout else ''
+
+
+def git_revision():
+    """Current commit of the plugin, if in a git repository."""
+    try:
+        out = subprocess.run(['git', 'describe', '--always', '--dirty'],
+                             capture_output=True, text=True)
+        return out.stdout.strip()
+    except FileNotFoundError:
+        return ''
+
+
+def run_one(op, lines, regions, nvim, timeout):
+    """Run a single operation in a new editor, return the result dict."""
+    setup, keys = OPS[op]
+    if '{n}' in keys:
+        keys = keys.replace('{n}', '') * regions
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp, 'result.json')
+        config = Path(tmp, 'config.vim')
+        config.write_text(
+            "let g:bench = {'lines': %d, 'regions': %d, 'out': '%s',\n"
+            "\\ 'setup': %s, 'keys': %s}\n"
+            % (lines, regions, out, vim_string(setup), vim_string(keys)))
+        cmd = [VIM, '-N', '-u', str(DEFAULT_VIMRC), '-i', 'NONE', '-n',
+               '--headless' if nvim else '-es',
+               '-c', 'source %s' % config, '-c', 'source %s' % DRIVER]
+        result = {'op': op, 'lines': lines, 'regions': regions}
+        try:
+            subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            result.update({'seconds': None, 'timeout': True})
+            return result
+        if out.exists():
+            result.update(json.loads(out.read_text()))
+            if op in EDITS and not result['changes']:
+                result['no_changes'] = True
+        else:
+            result.update({'seconds': None, 'error': True})
+        return result
+
+
+def exponent(points):
+    """Least squares slope of log(seconds) over log(regions).
+
+    About 1 for linear operations, 2 for quadratic ones."""
+    points = [(math.log(r), math.log(s)) for r, s in points if r > 0 and s]
+    if len(points) < 2:
+        return None
+    mx = sum(x for x, _ in points) / len(points)
+    my = sum(y for _, y in points) / len(points)
+    den = sum((x - mx) ** 2 for x, _ in points)
+    if not den:
+        return None
+    return round(sum((x - mx) * (y - my) for x, y in points) / den, 2)
+
+
+def scaling(results):
+    """Scaling exponent of each operation, for each buffer size."""
+    curves = {}
+    for r in results:
+        curve = curves.setdefault(r['op'], {}).setdefault(str(r['lines']), [])
+        curve.append((r['regions'], r['seconds']))
+    return {op: {lines: {'exponent': exponent(points), 'points': points}
+                 for lines, points in sizes.items()}
+            for op, sizes in curves.items()}
+
+
+def main():
+    """Main function."""
+    # arg parsing
+    parser = argparse.ArgumentParser(description='Run scalability benchmarks. See README.')
+    parser.add_argument('ops', nargs='*', help='run these operations only (default: all)')
+    parser.add_argument('-n', '--nvim', action='store_true', help='run in neovim instead of vim')
+    parser.add_argument('-l', '--list', action='store_true', help='list all operations')
+    parser.add_argument('--lines', nargs='+', type=int, default=[10000, 100000],
+                        help='buffer sizes in lines (default 10000 100000)')
+    parser.add_argument('--regions', nargs='+', type=int, default=[10, 100, 1000, 10000],
+                        help='numbers of regions (default 10 100 1000 10000)')
+    parser.add_argument('--timeout', type=float, default=300,
+                        help='seconds before a run is stopped (default 300)')
+    parser.add_argument('-o', '--output', help='write json to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.list:
+        for op, (setup, keys) in OPS.items():
+            print(op.ljust(20) + keys)
+        return
+
+    ops = args.ops or list(OPS)
+    for op in ops:
+        if op not in OPS:
+            sys.exit('unknown operation: %s' % op)
+
+    # clear vim environmental variable in case tests are run from within (n)vim
+    os.environ.pop('VIMRUNTIME', None)
+    os.environ.pop('VIM', None)
+
+    global VIM, DEFAULT_VIMRC, DRIVER
+    VIM = shutil.which('vim' if not args.nvim else 'nvim')
+    DEFAULT_VIMRC = Path('default/', 'vimrc.vim').resolve(strict=True)
+    DRIVER = Path('bench.vim').resolve(strict=True)
+
+    results = []
+    for op in ops:
+        for lines in sorted(args.lines):
+            for regions in sorted(args.regions):
+                result = run_one(op, lines, regions, args.nvim, args.timeout)
+                results.append(result)
+                time_str = 'timeout' if result['seconds'] is None else '%.3f' % result['seconds']
+                if result.get('no_changes'):
+                    time_str += '  (no changes!)'
+                print('%s %8d lines %8d regions  %s' % (op.ljust(12), lines, regions, time_str),
+                      file=sys.stderr)
+                # more regions would only take longer
+                if result['seconds'] is None:
+                    break
+
+    report = {
+        'editor': editor_version(),
+        'revision': git_revision(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'results': results,
+        'scaling': scaling(results),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if any(r.get('no_changes') for r in results):
+        sys.exit('some editing operations made no changes, their times are not valid')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+" Driver for bench.py: time a single operation in a synthetic buffer.
+"
+" g:bench is defined by bench.py before this file is sourced:
+"   lines:   number of lines in the buffer
+"   regions: number of occurrences of the word 'hit', spread over the lines
+"   setup:   keys to run before timing (not timed)
+"   keys:    keys to time
+"   out:     file where the result is written, as json
+
+fun! s:buffer(lines, regions) abort
+    " Create the buffer, with the same number of hits in most lines.
+    let per = max([1, (a:regions + a:lines - 1) / a:lines])
+    let R = a:regions
+    call setline(1, map(range(a:lines),
+                \ 'repeat("hit ", min([per, max([0, R - v:key * per])])) . "foo bar baz"'))
+    call cursor(1, 1)
+endfun
+
+fun! s:regions() abort
+    return exists('b:VM_Selection') ? len(b:VM_Selection.Regions) : 0
+endfun
+
+" VM undo/redo are not mapped by default
+let g:VM_maps = extend(get(g:, 'VM_maps', {}), {'Undo': 'u', 'Redo': '<C-r>'})
+
+let s:B = g:bench
+call s:buffer(s:B.lines, s:B.regions)
+
+if s:B.setup != ''
+    call feedkeys(s:B.setup, 'xt')
+endif
+let s:before = s:regions()
+let s:tick = b:changedtick
+
+let s:t = reltime()
+call feedkeys(s:B.keys, 'xt')
+let s:time = reltimefloat(reltime(s:t))
+
+call writefile([json_encode({
+            \ 'seconds': s:time,
+            \ 'regions_before': s:before,
+            \ 'regions_after': s:regions(),
+            \ 'lines_after': line('$'),
+            \ 'changes': b:changedtick - s:tick,
+            \ })], s:B.out)
+qa!
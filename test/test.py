@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
 from pathlib import Path, PurePath
 import os
 import sys
@@ -9,7 +12,6 @@ import shutil
 import filecmp
 import vimrunner
 import time
-import multiprocessing
 import subprocess
 from pynvim import attach
 
@@ -32,6 +34,8 @@ class bcolors:
 SUCCESS_STR = "{}SUCCESS{}".format(bcolors.OKGREEN, bcolors.ENDC)
 FAIL_STR = "{}FAIL{}".format(bcolors.FAIL, bcolors.ENDC)
 CLIENT = None
+SYNC_TIMEOUT = 10  # seconds to wait for the editor, before giving up
+SYNC_POLL = 0.01   # seconds between checks of the editor state
 
 
 # -------------------------------------------------------------
@@ -92,7 +96,6 @@ def get_paths(test, f):
     paths["config"] = Path('tests/', test, 'config.json').resolve()
     paths["exp_out_file"] = Path('tests/', test, 'expected_output_file.txt').resolve(strict=True)
     paths["gen_out_file"] = Path('tests/', test, 'generated_output_file.txt').resolve()
-    paths["socket"] = Path('socket_' + test).resolve()
     return paths
 
 
@@ -102,28 +105,37 @@ def keys_nvim(key_str):
     key_str = key_str.replace(r'\"', r'"')
     key_str = key_str.replace('\\\\', '\\')
     CLIENT.input(key_str)
-    time.sleep(KEY_PRESS_INTERVAL)
+    # requests are handled after the input sent before them, so any request
+    # returns only when the keys have been processed
+    CLIENT.eval('1')
+    delay()
 
 
 def keys_vim(key_str):
     """vim implementation of keys()"""
     CLIENT.feedkeys(key_str)
-    time.sleep(KEY_PRESS_INTERVAL)
+    # server requests are handled when vim waits for input, but check that
+    # no keys are left in the typeahead anyway
+    deadline = time.monotonic() + SYNC_TIMEOUT
+    while CLIENT.eval("state('m')") != '':
+        if time.monotonic() > deadline:
+            raise TimeoutError("vim is still processing keys: %s" % key_str)
+        time.sleep(SYNC_POLL)
+    delay()
+
+
+def delay():
+    """Optional delay after keys, to watch the tests run."""
+    if KEY_PRESS_INTERVAL:
+        time.sleep(KEY_PRESS_INTERVAL)
 
 
 def run_core(paths, nvim=False):
     """Start the test and return commands_cpu_time."""
     global CLIENT
     if nvim:
-        # client/server connection
-        server = multiprocessing.Process(
-            target=subprocess.call,
-            args=(VIM + " -u " + str(paths["vimrc"]) + ' --listen ' + str(paths["socket"]),),
-            kwargs={'shell': True}
-        )
-        server.start()
-        time.sleep(1)
-        CLIENT = attach('socket', path=str(paths["socket"]))
+        # embedded instance, ready as soon as it's attached
+        CLIENT = attach('child', argv=[VIM, '-u', str(paths["vimrc"]), '--embed', '--headless'])
         # run test
         CLIENT.command('e %s' % paths["in_file"])
         keys = keys_nvim
@@ -136,7 +148,9 @@ def run_core(paths, nvim=False):
         CLIENT.command(':w! %s' % paths["gen_out_file"])
         CLIENT.quit()
     else:
-        vim = vimrunner.Server(noplugin=False, vimrc=paths["vimrc"], executable=VIM)
+        # a server name for each test, so that tests can run in parallel
+        vim = vimrunner.Server(name='VIMRUNNER_' + paths["in_file"].parent.name,
+                               noplugin=False, vimrc=paths["vimrc"], executable=VIM)
         CLIENT = vim.start()
         CLIENT.edit(paths["in_file"])
         keys = keys_vim
@@ -145,6 +159,8 @@ def run_core(paths, nvim=False):
         end_time = time.process_time()
         CLIENT.feedkeys(r'\<Esc>')
         CLIENT.feedkeys(r':wq! %s\<CR>' % paths["gen_out_file"])
+        # the output file is complete when vim has exited
+        vim.server.join(SYNC_TIMEOUT)
     return end_time - start_time
 
 
@@ -160,9 +176,7 @@ def run_one_test(test, f=None, nvim=False):
     if os.path.exists(paths["gen_out_file"]):
         os.remove(paths["gen_out_file"])
     # run test
-    time.sleep(.5)
     commands_cpu_time = run_core(paths, nvim)
-    time.sleep(.5)
     # check results
     time_str = "(took {:.3f} sec)".format(commands_cpu_time)
     if filecmp.cmp(paths["exp_out_file"], paths["gen_out_file"]):
@@ -178,16 +192,49 @@ def run_one_test(test, f=None, nvim=False):
         return False
 
 
+def init_worker(vim, vimrc, interval, live_editing):
+    """Set the global variables in a worker process."""
+    global VIM, DEFAULT_VIMRC, KEY_PRESS_INTERVAL, LIVE_EDITING
+    VIM, DEFAULT_VIMRC, KEY_PRESS_INTERVAL, LIVE_EDITING = vim, vimrc, interval, live_editing
+
+
+def run_test_job(test, nvim):
+    """Run a test in a worker process, return the result and its log line."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = run_one_test(test, None, nvim)
+    return result, out.getvalue().rstrip("\n")
+
+
+def run_tests(tests, f, nvim, jobs):
+    """Run tests, in parallel if jobs > 1. Return the failing tests.
+
+    Results are logged in the order of the tests anyway."""
+    if jobs <= 1:
+        return [t for t in tests if run_one_test(t, f, nvim) is not True]
+    failing_tests = []
+    config = (VIM, DEFAULT_VIMRC, KEY_PRESS_INTERVAL, LIVE_EDITING)
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=config) as pool:
+        futures = [pool.submit(run_test_job, t, nvim) for t in tests]
+        for t, future in zip(tests, futures):
+            result, line = future.result()
+            log(line, f)
+            if result is not True:
+                failing_tests.append(t)
+    return failing_tests
+
+
 def main():
     """Main function."""
     # arg parsing
     parser = argparse.ArgumentParser(description='Run test suite. See README.')
     parser.add_argument('test', nargs='?', help='run <test> only instead of running all tests')
-    parser.add_argument('-t', '--time', nargs=1, type=float, default=[0.1], help='set key delay in seconds (default 0.1)')
+    parser.add_argument('-t', '--time', nargs=1, type=float, default=[0], help='set key delay in seconds (default 0)')
     parser.add_argument('-n', '--nvim', action='store_true', help='run in neovim instead of vim')
     parser.add_argument('-l', '--list', action='store_true', help='list all tests')
     parser.add_argument('-L', '--nolive', action='store_false', help='disable live editing')
     parser.add_argument('-d', '--diff', action='store_true', help='diff falied tests')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='run N tests in parallel (default 1)')
     args = parser.parse_args()
 
     # clear vim environmental variable in case tests are run from within (n)vim
@@ -211,9 +258,7 @@ def main():
     else:
         print_banner("Starting vim-visual-multi tests", f)
         tests = tests if args.test is None else [args.test]
-        for t in tests:
-            if run_one_test(t, f, args.nvim) is not True:
-                failing_tests.append(t)
+        failing_tests = run_tests(tests, f, args.nvim, args.jobs)
         if failing_tests == []:
             print_banner("summary: " + SUCCESS_STR, f)
         else:
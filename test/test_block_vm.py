@@ -1,101 +1,73 @@
 #!/usr/bin/env python3
 
-import subprocess
 import sys
-import time
-import os
 
 import pynvim
 
 
-def wait_for_socket(path, timeout=5):
-    for _ in range(timeout * 10):
-        if os.path.exists(path):
-            return
-        time.sleep(0.1)
-    raise TimeoutError(f"Socket {path} was not created in time")
+def sync(nv):
+    """Wait until nvim has processed the input sent so far.
 
+    Requests are handled after the input that was sent before them, so any
+    request returns only when the keys have been processed."""
+    nv.eval("1")
 
-def wait_for_vm_active(nv, timeout=5):
-    for _ in range(timeout * 10):
-        if nv.eval("get(b:, 'visual_multi', 0)"):
-            return
-        time.sleep(0.1)
-    raise TimeoutError("VM mode did not activate in time")
 
+def wait_for_vm_active(nv):
+    sync(nv)
+    if not nv.eval("get(b:, 'visual_multi', 0)"):
+        raise AssertionError("VM mode did not activate")
 
-def wait_for_buffer_change(nv, expected, timeout=5):
-    for _ in range(timeout * 10):
-        if nv.current.buffer[:] == expected:
-            return
-        time.sleep(0.1)
-    raise TimeoutError(
-        f"Buffer did not change to expected value. Got: {nv.current.buffer[:]}"
-    )
+
+def wait_for_buffer_change(nv, expected):
+    sync(nv)
+    if nv.current.buffer[:] != expected:
+        raise AssertionError(
+            f"Buffer did not change to expected value. Got: {nv.current.buffer[:]}"
+        )
 
 
-def wait_for_regions(nv, count, timeout=5):
+def wait_for_regions(nv, count):
     """Wait for VM to have exactly 'count' regions."""
-    for _ in range(timeout * 10):
-        regions = nv.eval("get(get(b:, 'VM_Selection', {}), 'Regions', [])")
-        if len(regions) == count:
-            return regions
-        time.sleep(0.1)
+    sync(nv)
     regions = nv.eval("get(get(b:, 'VM_Selection', {}), 'Regions', [])")
-    raise TimeoutError(
-        f"Expected {count} regions, but got {len(regions)} after {timeout}s: {regions}"
-    )
+    if len(regions) != count:
+        raise AssertionError(
+            f"Expected {count} regions, but got {len(regions)}: {regions}"
+        )
+    return regions
 
 
-def wait_for_condition(_nv, condition_fn, error_msg, timeout=5):
+def wait_for_condition(nv, condition_fn, error_msg):
     """Wait for a custom condition function to return True."""
-    for _ in range(timeout * 10):
-        if condition_fn():
-            return
-        time.sleep(0.1)
-    raise TimeoutError(f"{error_msg} (timeout after {timeout}s)")
+    sync(nv)
+    if not condition_fn():
+        raise AssertionError(error_msg)
 
 
-def wait_for_vm_inactive(nv, timeout=5):
+def wait_for_vm_inactive(nv):
     """Wait for VM mode to be deactivated."""
-    for _ in range(timeout * 10):
-        if not nv.eval("get(b:, 'visual_multi', 0)"):
-            return
-        time.sleep(0.1)
-    raise TimeoutError("VM mode did not deactivate in time")
+    sync(nv)
+    if nv.eval("get(b:, 'visual_multi', 0)"):
+        raise AssertionError("VM mode did not deactivate")
 
 
-def wait_for_regions_on_lines(nv, expected_lines, timeout=5):
+def wait_for_regions_on_lines(nv, expected_lines):
     """Wait for VM regions to be on specific lines."""
-    for _ in range(timeout * 10):
-        regions = nv.eval("get(get(b:, 'VM_Selection', {}), 'Regions', [])")
-        if len(regions) == len(expected_lines):
-            actual_lines = [r["l"] for r in regions]
-            if actual_lines == expected_lines:
-                return regions
-        time.sleep(0.1)
+    sync(nv)
     regions = nv.eval("get(get(b:, 'VM_Selection', {}), 'Regions', [])")
     actual_lines = [r["l"] for r in regions]
-    raise TimeoutError(
-        f"Expected regions on lines {expected_lines}, got {actual_lines} after {timeout}s"
-    )
+    if actual_lines != expected_lines:
+        raise AssertionError(
+            f"Expected regions on lines {expected_lines}, got {actual_lines}"
+        )
+    return regions
 
 
 def setup_nvim():
     """Start and configure nvim instance."""
-    sock_path = "/tmp/nvim_test.sock"
-    if os.path.exists(sock_path):
-        os.remove(sock_path)
-
-    # pylint: disable=consider-using-with
-    proc = subprocess.Popen(
-        ["nvim", "--listen", sock_path, "--headless"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-
-    wait_for_socket(sock_path)
-    nv = pynvim.attach("socket", path=sock_path)
+    # embedded instance, ready as soon as it's attached
+    nv = pynvim.attach("child", argv=["nvim", "--embed", "--headless"])
 
     # Load plugin and setup mappings
     nv.command("set runtimepath+=.")
@@ -115,7 +87,7 @@ def setup_nvim():
     # For visual mode, find within selection (respects block boundaries)
     nv.command("xnoremap <silent> <M-n> :<C-u>call vm#visual#find_in_selection()<CR>")
 
-    return nv, proc, sock_path
+    return nv
 
 
 def test_single_column_block(nv):
@@ -263,19 +235,19 @@ def test_undo_single_operation(nv):
     wait_for_vm_active(nv)
 
     # Insert " word" at end of lines - type character by character
-    # The sleeps here are intentional to simulate real typing and test undo grouping
+    # Each key is processed before the next one, as in real typing, to test undo grouping
     nv.input("a")  # Enter insert mode
-    time.sleep(0.05)
+    sync(nv)
     nv.input(" ")  # Type space
-    time.sleep(0.05)
+    sync(nv)
     nv.input("w")  # Type w
-    time.sleep(0.05)
+    sync(nv)
     nv.input("o")  # Type o
-    time.sleep(0.05)
+    sync(nv)
     nv.input("r")  # Type r
-    time.sleep(0.05)
+    sync(nv)
     nv.input("d")  # Type d
-    time.sleep(0.05)
+    sync(nv)
     nv.input("<Esc>")  # Exit insert mode
 
     expected_after = [
@@ -293,14 +265,14 @@ def test_undo_single_operation(nv):
         "hello",
         "hello",
     ]
-    wait_for_buffer_change(nv, expected_after_undo, timeout=2)
+    wait_for_buffer_change(nv, expected_after_undo)
 
     buf_after_first_undo = nv.current.buffer[:]
 
     # If first undo didn't restore, try a second undo (bug exists)
     if buf_after_first_undo != expected_after_undo:
         nv.command("normal! u")
-        wait_for_buffer_change(nv, expected_after_undo, timeout=2)
+        wait_for_buffer_change(nv, expected_after_undo)
         buf_after_second_undo = nv.current.buffer[:]
     else:
         buf_after_second_undo = None
@@ -611,7 +583,7 @@ def test_search_forward_multiline_block_visual(nv):
     # First, set the search pattern to "item"
     nv.command("normal! gg")
     nv.input("/item<CR>")
-    time.sleep(0.1)
+    sync(nv)
 
     # Block visual selection covering (cols 11-27, 17 chars wide):
     # Line 1: "cccc target item " - contains "target" and "item"
@@ -698,7 +670,7 @@ def test_substitute_motion_with_multicursor(nv):
 
     # Exit extend mode to cursor mode (normal multi-cursor mode)
     nv.input("<Esc>")
-    time.sleep(0.1)
+    sync(nv)
 
     # Step 2: Navigate to value1 positions
     nv.input("j")  # Down one line to value1 line
@@ -706,7 +678,7 @@ def test_substitute_motion_with_multicursor(nv):
 
     # Step 3: Yank the quoted strings at each cursor using ya" (around quotes)
     nv.input('ya"')
-    time.sleep(0.2)
+    sync(nv)
 
     # Step 4: Navigate to field1 = value1 line and position at 'v' of value1
     nv.input("j")  # Down to field1 line
@@ -718,7 +690,7 @@ def test_substitute_motion_with_multicursor(nv):
 
     # Use VM substitute operator with 'se' (substitute to end of word)
     nv.input("se")
-    time.sleep(0.3)
+    sync(nv)
 
     # Get final state
     lines_after = list(nv.current.buffer[:])
@@ -858,16 +830,13 @@ def test_find_visual_selection_incremental(nv):
     return all(result for result, _ in test_results), test_results
 
 
-def cleanup_nvim(nv, nv_process, sock_path):
+def cleanup_nvim(nv):
     """Clean up nvim instance."""
     try:
         nv.command("qa!")
     except Exception:  # pylint: disable=broad-except
         pass
-    nv_process.terminate()
-    nv_process.wait()
-    if os.path.exists(sock_path):
-        os.remove(sock_path)
+    nv.close()
 
 
 def run_test_and_report(name, test_func, nv, retries=1):
@@ -884,10 +853,6 @@ def run_test_and_report(name, test_func, nv, retries=1):
             print(f"✓ {name} test passed{retry_msg}")
             return passed, test_results
 
-        if attempt < retries - 1:
-            # Not the last attempt, will retry
-            time.sleep(0.2)
-
     # All attempts failed
     print(f"✗ {name} test failed:")
     for result, msg in test_results:
@@ -898,7 +863,7 @@ def run_test_and_report(name, test_func, nv, retries=1):
 
 def main():
     """Main test execution."""
-    nv, nv_process, sock_path = setup_nvim()
+    nv = setup_nvim()
 
     try:
         # Test cases: (name, test_func, retries)
@@ -946,7 +911,7 @@ def main():
         return 0 if all(passed for _, passed, _ in all_results) else 1
 
     finally:
-        cleanup_nvim(nv, nv_process, sock_path)
+        cleanup_nvim(nv)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+# cursor motions in lines with multibyte characters
+keys(r'\<C-Down>\<C-Down>')
+keys('e')
+keys('r|')
+keys('wl')
+keys('r+')
+keys(r'\<Esc>')
+keys(r'\<Esc>')
+
+# vertical motions across wide characters
+keys('6G4l')
+keys(r'\<C-Up>')
+keys('j')
+keys('r|')
+keys(r'\<Esc>')
+keys(r'\<Esc>')
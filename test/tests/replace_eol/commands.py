@@ -0,0 +1,20 @@
+# replace mode at the end of the line
+
+keys(r'2\<C-Down>')
+keys('$')
+keys('R')
+keys('XYZ')
+keys(r'\<Esc>')
+keys('i|')
+keys(r'\<Esc>')
+keys(r'\<Esc>')
+
+# in the middle of the line, going past its end
+keys('5gg0w')
+keys(r'\<C-Down>')
+keys('R')
+keys('dolor sit')
+keys(r'\<Esc>')
+keys('a|')
+keys(r'\<Esc>')
+keys(r'\<Esc>')
@@ -0,0 +1,14 @@
+# cursors from a char-wise selection starting on a blank
+L = '\\\\\\\\'
+
+keys('0vjj' + L + 'c')
+keys('r|')
+keys(r'\<Esc>')
+keys(r'\<Esc>')
+
+# starting on a blank after the first column
+keys('}jl')
+keys('vjj' + L + 'c')
+keys('r|')
+keys(r'\<Esc>')
+keys(r'\<Esc>')